@@ -25,6 +25,12 @@ setup(
         "python-dotenv>=1.0.0",
     ],
     extras_require={
+        # Décompression gzip accélérée (ISA-L)
+        "fast": [
+            "isal>=1.0.0",
+            "orjson>=3.0.0",
+            "blake3>=0.3.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
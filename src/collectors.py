@@ -1,25 +1,90 @@
 """Module de collecte des fichiers depuis les serveurs sources."""
 import os
+import atexit
+import logging
 import subprocess
 import shutil
 import shlex
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 
-from .config import Config, ServerConfig, RsyncConfig
-from .retry import RetryableOperation
-from .state import StateManager
+from .config import Config, ServerConfig, RsyncConfig, _ensure_dir
+from .retry import RetryableOperation, calculate_backoff_delay
+from .state import FileState, StateManager
 from .logger import get_logger
 
 logger = get_logger()
 
+def _parse_timestamp(value: str) -> Optional[float]:
+    """Convertit un horodatage d'état ISO-8601 UTC ("...Z") en secondes epoch."""
+    try:
+        parsed = datetime.strptime(value.rstrip("Z"), "%Y-%m-%dT%H:%M:%S.%f")
+    except (AttributeError, ValueError):
+        return None
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
+
+# Extensions de fichiers déjà compressés : la compression rsync (-z) n'y gagne rien
+_COMPRESSED_EXTENSIONS = frozenset({".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".zip"})
+
+# Options de compression rsync prenant une valeur (forme "--opt valeur")
+_COMPRESS_VALUE_OPTIONS = ("--compress-level", "--compress-choice", "--zc", "--zl")
+
+
+def _is_compressed(path: str) -> bool:
+    """True si l'extension du fichier correspond à un format déjà compressé."""
+    return os.path.splitext(path)[1].lower() in _COMPRESSED_EXTENSIONS
+
+
+def _strip_compression(options: List[str]) -> List[str]:
+    """Retire -z/--compress (et leurs réglages) d'une liste d'options rsync."""
+    result: List[str] = []
+    skip_value = False
+    for opt in options:
+        if skip_value:
+            skip_value = False
+            continue
+        if opt == "--compress" or opt.startswith(tuple(o + "=" for o in _COMPRESS_VALUE_OPTIONS)):
+            continue
+        if opt in _COMPRESS_VALUE_OPTIONS:
+            skip_value = True
+            continue
+        if opt.startswith("-") and not opt.startswith("--") and opt[1:].isalpha() and "z" in opt:
+            # Options courtes groupées, ex. -avz -> -av
+            opt = opt.replace("z", "")
+            if opt == "-":
+                continue
+        result.append(opt)
+    return result
+
+
+def _format_cmd(cmd: List[str]) -> str:
+    """Représentation d'une commande pour les logs, chaque argument quoté pour le shell."""
+    return " ".join(shlex.quote(arg) for arg in cmd)
+
 
 class CopyError(Exception):
     """Exception pour erreurs de copie."""
     pass
 
 
+@dataclass
+class RemoteFile:
+    """Fichier distant tel que listé sur le serveur source."""
+    path: str
+    size: Optional[int] = None
+    mtime: Optional[float] = None  # secondes depuis epoch
+    name: str = field(init=False)
+
+    def __post_init__(self):
+        self.name = os.path.basename(self.path)
+
+
 class Collector:
     """Collecteur de fichiers depuis les serveurs sources."""
     
@@ -38,7 +103,78 @@ class Collector:
             config=config.retry,
             operation_name="copy",
         )
+
+        # Résolus une seule fois : évite de parcourir le PATH à chaque copie
+        self._rsync_path = shutil.which("rsync")
+        self._sshpass_path = shutil.which("sshpass")
+
+        # Valeurs dérivées de la configuration, calculées une fois pour toutes les copies
+        self._rsync_options = self.config.rsync.options.split()
+        self._rsync_timeout_str = str(self.config.rsync.timeout)
+        self._ssh_passwords: Dict[str, Optional[str]] = {}
+        # Préfixes ssh / "-e" rsync et environnements subprocess, par serveur
+        self._ssh_prefixes: Dict[str, Tuple[List[str], str]] = {}
+        self._subprocess_envs: Dict[str, dict] = {}
+        self._server_options: Dict[Tuple[str, bool], List[str]] = {}
+
+        # Multiplexage SSH : une connexion maîtresse par hôte, réutilisée par
+        # tous les ssh/rsync suivants (pas de nouveau handshake ni d'authentification)
+        self._cm_dir = config.data_root / ".ssh-cm"
+        self._cm_hosts: set = set()
+        if os.name == "nt":
+            # ControlMaster n'est pas supporté par OpenSSH pour Windows
+            self._ssh_opts: List[str] = []
+        else:
+            _ensure_dir(self._cm_dir, mode=0o700)
+            self._ssh_opts = [
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self._cm_dir}/%r@%h:%p",
+                "-o", "ControlPersist=10m",
+                "-o", "ServerAliveInterval=30",
+            ]
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        """Ferme les connexions SSH maîtresses ouvertes pendant l'exécution."""
+        for user, host in list(self._cm_hosts):
+            try:
+                subprocess.run(
+                    ["ssh", "-O", "exit", "-o", f"ControlPath={self._cm_dir}/%r@%h:%p",
+                     f"{user}@{host}"],
+                    capture_output=True,
+                    timeout=10,
+                )
+            except Exception as e:
+                logger.debug(f"Failed to close SSH master for {host}: {e}")
+            self._cm_hosts.discard((user, host))
     
+    def _recently_failed(
+        self, server: ServerConfig, filename: str, state: Optional[FileState]
+    ) -> bool:
+        """
+        True si la dernière copie du fichier a échoué définitivement il y a
+        moins que le délai de backoff correspondant à son nombre de tentatives
+        (retry.delay_base, doublé à chaque échec, plafonné à retry.delay_max).
+
+        S'appuie sur l'état persistant : le délai s'applique d'une exécution
+        à l'autre (cron), pas seulement dans un processus de longue durée.
+        Un fichier dans un autre état n'est jamais bloqué.
+        """
+        if state is None or state.status != "error" or state.error_type != "copy":
+            return False
+        failed_at = _parse_timestamp(state.last_updated)
+        if failed_at is None:
+            return False
+        retry = self.config.retry
+        cooldown = calculate_backoff_delay(
+            max(1, state.copy_retry_count),
+            retry.delay_base,
+            retry.delay_max,
+            retry.backoff_multiplier,
+            use_jitter=False,
+        )
+        return time.time() - failed_at < cooldown
+
     def _check_rsync_available(self) -> bool:
         """
         Vérifie si rsync est disponible.
@@ -46,7 +182,7 @@ class Collector:
         Returns:
             True si rsync est disponible.
         """
-        return shutil.which("rsync") is not None
+        return self._rsync_path is not None
 
     def _resolve_ssh_password(self, server: ServerConfig) -> Optional[str]:
         """
@@ -56,71 +192,141 @@ class Collector:
         1. champ password dans sources.conf
         2. variable SSH_PASSWORD_<NOM_SERVEUR> (ex. SSH_PASSWORD_BRS1)
         3. variable globale SSH_PASSWORD dans .env
+
+        load_config résout déjà 2 et 3 (.env compris) dans server.password ;
+        l'environnement du processus n'est relu que pour les ServerConfig
+        construits à la main. Le résultat est mis en cache par serveur.
+        """
+        if server.name in self._ssh_passwords:
+            return self._ssh_passwords[server.name]
+
+        password = server.password
+        if not password:
+            env_key = f"SSH_PASSWORD_{server.name.upper().replace('-', '_')}"
+            password = os.getenv(env_key, "").strip() or os.getenv("SSH_PASSWORD", "").strip() or None
+
+        self._ssh_passwords[server.name] = password
+        return password
+
+    def refresh_credentials(self) -> None:
+        """
+        Invalide les mots de passe et commandes mis en cache.
+
+        À appeler si SSH_PASSWORD (ou un mot de passe serveur) change en cours
+        d'exécution ; les préfixes seront reconstruits au prochain appel.
+        """
+        self._ssh_passwords.clear()
+        self._ssh_prefixes.clear()
+        self._subprocess_envs.clear()
+
+    def _ssh_prefix(self, server: ServerConfig) -> Tuple[List[str], str]:
+        """
+        Préfixes SSH d'un serveur, construits une seule fois.
+
+        Returns:
+            (commande ssh en liste, commande ssh en chaîne pour l'option -e de rsync)
         """
-        if server.password:
-            return server.password
+        prefix = self._ssh_prefixes.get(server.name)
+        if prefix is not None:
+            return prefix
+
+        password = self._resolve_ssh_password(server)
+        ssh_cmd = ["ssh"] + self._ssh_opts
+        ssh_str = " ".join(["ssh"] + [shlex.quote(o) for o in self._ssh_opts])
+        if password:
+            ssh_cmd = self._wrap_with_sshpass(password, ssh_cmd)
+            ssh_str = f"{shlex.quote(self._sshpass_path)} -e {ssh_str}"
 
-        env_key = f"SSH_PASSWORD_{server.name.upper().replace('-', '_')}"
-        per_server = os.getenv(env_key, "").strip()
-        if per_server:
-            return per_server
+        if self._ssh_opts:
+            self._cm_hosts.add((server.user, server.host))
 
-        global_pwd = os.getenv("SSH_PASSWORD", "").strip()
-        return global_pwd or None
+        prefix = (ssh_cmd, ssh_str)
+        self._ssh_prefixes[server.name] = prefix
+        return prefix
 
     def _wrap_with_sshpass(self, password: str, cmd: List[str]) -> List[str]:
         """Préfixe une commande avec sshpass -e (mot de passe via SSHPASS)."""
         if not password:
             return cmd
-        if not shutil.which("sshpass"):
+        if not self._sshpass_path:
             raise CopyError(
                 "sshpass is required for password authentication but was not found. "
                 "Install sshpass or use SSH key authentication."
             )
-        return ["sshpass", "-e"] + cmd
+        return [self._sshpass_path, "-e"] + cmd
 
     def _subprocess_env(self, server: ServerConfig) -> dict:
         """Environnement subprocess avec SSHPASS si authentification par mot de passe."""
-        env = os.environ.copy()
-        password = self._resolve_ssh_password(server)
-        if password:
-            env["SSHPASS"] = password
+        env = self._subprocess_envs.get(server.name)
+        if env is None:
+            env = os.environ.copy()
+            password = self._resolve_ssh_password(server)
+            if password:
+                env["SSHPASS"] = password
+            self._subprocess_envs[server.name] = env
         return env
 
     def _build_ssh_base_cmd(self, server: ServerConfig) -> List[str]:
-        """Construit la commande SSH (avec sshpass si mot de passe configuré)."""
-        password = self._resolve_ssh_password(server)
-        cmd = ["ssh"]
-        return self._wrap_with_sshpass(password, cmd) if password else cmd
+        """
+        Commande SSH (avec sshpass si mot de passe configuré).
+
+        La liste retournée est partagée : la concaténer, ne pas la modifier.
+        """
+        return self._ssh_prefix(server)[0]
     
+    def _rsync_options_for(self, server: ServerConfig, compressed: bool = False) -> List[str]:
+        """
+        Options rsync effectives pour un serveur et un type de fichier.
+
+        En mode append, seuls les octets ajoutés depuis la dernière copie sont
+        transférés (--append-verify vérifie la partie déjà présente), écrits
+        directement dans le fichier cible (--inplace). Pour les fichiers déjà
+        compressés (.gz, .zst...), la compression rsync est retirée.
+        """
+        key = (server.name, compressed)
+        options = self._server_options.get(key)
+        if options is not None:
+            return options
+
+        append_mode = server.append_mode
+        if append_mode is None:
+            append_mode = self.config.rsync.append_mode
+
+        options = list(self._rsync_options)
+        if append_mode:
+            # --whole-file désactive l'algorithme delta dont dépend --append-verify
+            options = [o for o in options if o not in ("-W", "--whole-file")]
+            for opt in ("--append-verify", "--inplace", "--partial"):
+                if opt not in options:
+                    options.append(opt)
+
+        if compressed:
+            options = _strip_compression(options)
+
+        self._server_options[key] = options
+        return options
+
     def _build_rsync_command(
         self,
         server: ServerConfig,
         remote_path: str,
         local_dest: Path,
+        extra_options: Optional[List[str]] = None,
+        compressed: Optional[bool] = None,
     ) -> List[str]:
         remote = f"{server.user}@{server.host}:{remote_path}"
-        options = self.config.rsync.options.split()
-        password = self._resolve_ssh_password(server)
+        if compressed is None:
+            compressed = _is_compressed(remote_path)
+        options = self._rsync_options_for(server, compressed) + (extra_options or [])
+        ssh_cmd = self._ssh_prefix(server)[1]
 
-        rsync_cmd = ["rsync"] + options + [
-            "--timeout", str(self.config.rsync.timeout),
+        rsync_cmd = [self._rsync_path or "rsync"] + options + [
+            "-e", ssh_cmd,
+            "--timeout", self._rsync_timeout_str,
             remote,
             str(local_dest),
         ]
 
-        if password:
-            if not shutil.which("sshpass"):
-                raise CopyError(
-                    "sshpass is required for password authentication but was not found."
-                )
-            rsync_cmd = ["rsync"] + options + [
-                "-e", "sshpass -e ssh",
-                "--timeout", str(self.config.rsync.timeout),
-                remote,
-                str(local_dest),
-            ]
-
         return rsync_cmd
     
     def _copy_file(
@@ -147,33 +353,39 @@ class Collector:
             raise CopyError("rsync is not available on this system")
         
         # S'assurer que le répertoire de destination existe
-        local_dest.mkdir(parents=True, exist_ok=True)
+        self.config.ensure_server_dirs(server.name)
         
         # Construire la commande rsync
         cmd = self._build_rsync_command(server, remote_path, local_dest)
         
-        logger.debug(
-            f"Running rsync command: {' '.join(cmd)}",
-            extra={"server": server.name, "operation": "copy"},
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Running rsync command: %s",
+                _format_cmd(cmd),
+                extra={"server": server.name, "operation": "copy"},
+            )
         
         try:
             # Exécuter rsync
+            # stdout n'est pas exploité : on ne le capture pas, et stderr
+            # n'est décodé qu'en cas d'échec
             result = subprocess.run(
                 cmd,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 timeout=self.config.rsync.timeout + 10,
                 env=self._subprocess_env(server),
             )
             
             if result.returncode != 0:
-                error_msg = result.stderr or result.stdout or "Unknown rsync error"
+                error_msg = (
+                    result.stderr.decode("utf-8", errors="replace").strip()
+                    or "Unknown rsync error"
+                )
                 raise CopyError(f"rsync failed: {error_msg}")
             
             # Trouver le fichier copié (rsync garde le nom du fichier source)
-            filename = Path(remote_path).name
-            local_file = local_dest / filename
+            local_file = local_dest / os.path.basename(remote_path)
             
             # Vérifier que le fichier existe
             if not local_file.exists():
@@ -193,10 +405,281 @@ class Collector:
                 raise
             raise CopyError(f"Unexpected error during copy: {str(e)}")
     
+    def _copy_files_batch(
+        self,
+        server: ServerConfig,
+        remote_paths: List[str],
+        local_dest: Path,
+        on_copied: Optional[Callable[[str], None]] = None,
+    ) -> Set[str]:
+        """
+        Copie plusieurs fichiers d'un serveur en une seule invocation rsync.
+
+        La liste des fichiers est transmise sur l'entrée standard (--files-from=-),
+        ce qui évite un fork/exec et une négociation rsync par fichier. La sortie
+        de rsync est lue au fil de l'eau : on_copied est appelé dès qu'un fichier
+        est terminé, pendant que les suivants sont encore en transfert.
+
+        Args:
+            server: Configuration du serveur.
+            remote_paths: Chemins distants absolus des fichiers.
+            local_dest: Répertoire de destination locale.
+            on_copied: Callback optionnel appelé avec le nom de chaque fichier transféré.
+
+        Returns:
+            Noms des fichiers copiés avec succès.
+
+        Raises:
+            CopyError: Si aucun fichier n'a pu être transféré.
+        """
+        if not self._check_rsync_available():
+            raise CopyError("rsync is not available on this system")
+
+        self.config.ensure_server_dirs(server.name)
+
+        # --no-relative : les fichiers sont déposés à plat dans local_dest
+        # --out-format : une ligne "<octets> <nom>" par fichier transféré ; la présence
+        # de %b fait écrire la ligne par rsync une fois le fichier reçu (et non avant)
+        cmd = self._build_rsync_command(
+            server,
+            "/",
+            local_dest,
+            ["--files-from=-", "--no-relative", "--out-format=%b %n"],
+            compressed=all(_is_compressed(p) for p in remote_paths),
+        )
+        filenames = {os.path.basename(p) for p in remote_paths}
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Running batch rsync for %d files: %s",
+                len(remote_paths),
+                _format_cmd(cmd),
+                extra={"server": server.name, "operation": "copy"},
+            )
+
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=self._subprocess_env(server),
+        )
+        timeout = self.config.rsync.timeout * max(1, len(remote_paths)) + 10
+        timer = threading.Timer(timeout, proc.kill)
+        stderr_chunks: List[str] = []
+
+        def feed_stdin() -> None:
+            try:
+                proc.stdin.write("\n".join(remote_paths) + "\n")
+                proc.stdin.close()
+            except OSError:
+                pass
+
+        # stdin et stderr sont servis par des threads pour ne jamais bloquer sur un pipe plein
+        feeder = threading.Thread(target=feed_stdin, daemon=True)
+        drainer = threading.Thread(
+            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True
+        )
+        timer.start()
+        feeder.start()
+        drainer.start()
+
+        transferred: Set[str] = set()
+        try:
+            for line in proc.stdout:
+                parts = line.rstrip("\n").split(" ", 1)
+                if len(parts) != 2:
+                    continue
+                name = os.path.basename(parts[1])
+                if name in filenames and name not in transferred:
+                    transferred.add(name)
+                    if on_copied:
+                        on_copied(name)
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+            feeder.join()
+            drainer.join()
+
+        stderr = "".join(stderr_chunks)
+
+        if returncode < 0:
+            raise CopyError(f"batch rsync timeout on {server.name}")
+
+        if returncode == 0:
+            # Les fichiers absents de la sortie étaient déjà à jour localement
+            copied = {
+                name for name in filenames
+                if name in transferred or (local_dest / name).exists()
+            }
+        elif returncode in (23, 24):
+            # Transfert partiel : ne retenir que les fichiers annoncés par rsync
+            copied = transferred
+        else:
+            error_msg = stderr or "Unknown rsync error"
+            raise CopyError(f"batch rsync failed: {error_msg}")
+
+        if not copied:
+            error_msg = stderr or "no file transferred"
+            raise CopyError(f"batch rsync failed: {error_msg}")
+
+        logger.info(
+            f"Batch rsync copied {len(copied)}/{len(filenames)} files from {server.name}",
+            extra={"server": server.name, "operation": "copy"},
+        )
+
+        return copied
+
+    @staticmethod
+    def _snapshot_dir(path: Path) -> Dict[str, os.stat_result]:
+        """
+        Relève en un seul parcours les fichiers présents dans un répertoire.
+
+        Returns:
+            Dictionnaire nom de fichier -> stat (vide si le répertoire n'existe pas).
+        """
+        snapshot: Dict[str, os.stat_result] = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        snapshot[entry.name] = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _existing_copy(
+        self,
+        server: ServerConfig,
+        filename: str,
+        local_file: Path,
+        state,
+        dir_snapshot: Optional[Dict[str, os.stat_result]] = None,
+        remote: Optional[RemoteFile] = None,
+    ) -> Tuple[bool, Optional[Path]]:
+        """
+        Détermine si un fichier peut être ignoré car déjà collecté.
+
+        Args:
+            dir_snapshot: Relevé du répertoire de local_file (voir _snapshot_dir)
+                utilisé à la place d'un stat par fichier s'il est fourni.
+            remote: Taille et mtime distants issus du listing, s'ils sont connus.
+
+        Returns:
+            (True, chemin ou None) si aucune copie n'est nécessaire,
+            (False, None) sinon.
+        """
+        if dir_snapshot is not None:
+            st = dir_snapshot.get(filename)
+        else:
+            try:
+                st = local_file.stat()
+            except OSError:
+                st = None
+
+        # Si le fichier est déjà traité, skip
+        if state and state.status in ["processed", "extracted"]:
+            logger.info(
+                f"File {filename} already processed, skipping",
+                extra={"server": server.name, "file": filename, "operation": "copy"},
+            )
+            return True, local_file if st is not None else None
+
+        # Si le fichier est déjà copié et valide, le retourner
+        if state and state.status == "copied" and state.checksum:
+            if st is None:
+                return False, None
+
+            # Le fichier distant a changé depuis la copie : inutile de vérifier la copie locale
+            if remote is not None and remote.size is not None and (
+                remote.size != state.size
+                or (
+                    remote.mtime is not None
+                    and state.mtime_ns is not None
+                    and int(remote.mtime) > state.mtime_ns // 1_000_000_000
+                )
+            ):
+                logger.debug(
+                    f"File {filename} changed on {server.name} since last copy",
+                    extra={"server": server.name, "file": filename, "operation": "copy"},
+                )
+                return False, None
+
+            # Taille et mtime inchangés depuis la copie : inutile de relire le fichier
+            if (
+                state.mtime_ns is not None
+                and st.st_mtime_ns == state.mtime_ns
+                and st.st_size == state.size
+            ):
+                logger.debug(
+                    f"File {filename} already copied (size/mtime unchanged)",
+                    extra={"server": server.name, "file": filename, "operation": "copy"},
+                )
+                return True, local_file
+
+            # Sinon, vérifier le checksum pour s'assurer que le fichier est intact
+            current_checksum = self.state_manager.calculate_checksum(local_file)
+            if current_checksum == state.checksum:
+                logger.debug(
+                    f"File {filename} already copied and verified (checksum)",
+                    extra={"server": server.name, "file": filename, "operation": "copy"},
+                )
+                return True, local_file
+
+        return False, None
+
+    def _record_copy(
+        self,
+        server: ServerConfig,
+        filename: str,
+        local_file: Path,
+        expected_size: Optional[int] = None,
+        state: Optional[FileState] = None,
+    ) -> Path:
+        """
+        Enregistre checksum, taille et statut "copied" d'un fichier copié.
+
+        Args:
+            state: État du fichier déjà détenu par l'appelant, s'il existe.
+
+        Raises:
+            CopyError: Si la taille locale diffère de expected_size.
+        """
+        st = local_file.stat()
+        if expected_size is not None and st.st_size != expected_size:
+            raise CopyError(
+                f"Size mismatch for {local_file}: {st.st_size} bytes, expected {expected_size}"
+            )
+        checksum = self.state_manager.calculate_checksum(local_file)
+
+        if state is None:
+            state = self.state_manager.get_or_create_state(filename, server.name)
+        self.state_manager.patch_state(
+            state,
+            status="copied",
+            checksum=checksum,
+            copy_retry_count=0,  # Reset après succès
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+        )
+
+        logger.info(
+            f"File collected successfully: {local_file}",
+            extra={"server": server.name, "file": filename, "operation": "copy"},
+        )
+
+        return local_file
+
     def collect_file(
         self,
         server: ServerConfig,
         remote_path: str,
+        dir_snapshot: Optional[Dict[str, os.stat_result]] = None,
+        states_map: Optional[Dict[str, FileState]] = None,
+        remote: Optional[RemoteFile] = None,
     ) -> Optional[Path]:
         """
         Collecte un fichier depuis un serveur avec retry.
@@ -204,84 +687,65 @@ class Collector:
         Args:
             server: Configuration du serveur.
             remote_path: Chemin distant du fichier.
+            dir_snapshot: Relevé optionnel du répertoire incoming/ du serveur.
+            states_map: États du serveur déjà chargés (voir get_states_bulk).
+            remote: Taille et mtime distants issus du listing, s'ils sont connus.
         
         Returns:
             Chemin du fichier collecté ou None si échec après retries.
         """
-        filename = Path(remote_path).name
+        filename = os.path.basename(remote_path)
         local_dest = self.config.data_root / "incoming" / server.name
+        local_file = local_dest / filename
         
         # Vérifier l'état actuel
-        state = self.state_manager.get_state(filename, server.name)
-        
-        # Si le fichier est déjà traité, skip
-        if state and state.status in ["processed", "extracted"]:
-            logger.info(
-                f"File {filename} already processed, skipping",
+        if states_map is not None:
+            state = states_map.get(filename)
+        else:
+            state = self.state_manager.get_state(filename, server.name)
+
+        if self._recently_failed(server, filename, state):
+            logger.debug(
+                f"Skipping {filename} from {server.name}: copy failed recently",
                 extra={"server": server.name, "file": filename, "operation": "copy"},
             )
-            return local_dest / filename if (local_dest / filename).exists() else None
-        
-        # Si le fichier est déjà copié et valide, le retourner
-        local_file = local_dest / filename
-        if local_file.exists() and state and state.status == "copied":
-            # Vérifier le checksum pour s'assurer que le fichier est intact
-            if state.checksum:
-                current_checksum = self.state_manager.calculate_checksum(local_file)
-                if current_checksum == state.checksum:
-                    logger.debug(
-                        f"File {filename} already copied and verified",
-                        extra={"server": server.name, "file": filename, "operation": "copy"},
-                    )
-                    return local_file
+            return None
+
+        skip, existing = self._existing_copy(
+            server, filename, local_file, state, dir_snapshot, remote
+        )
+        if skip:
+            return existing
         
         # Mettre à jour le compteur de retry
-        retry_count = (state.copy_retry_count if state else 0) + 1
-        self.state_manager.update_state(
-            filename,
-            server.name,
-            copy_retry_count=retry_count,
+        if state is None:
+            state = self.state_manager.get_or_create_state(filename, server.name)
+        self.state_manager.patch_state(
+            state,
+            copy_retry_count=state.copy_retry_count + 1,
             status="pending",
         )
         
         try:
             # Copier avec retry
-            def copy_operation():
-                return self._copy_file(server, remote_path, local_dest)
-            
-            local_file = self.retry_operation.execute(copy_operation)
-            
-            # Calculer le checksum
-            checksum = self.state_manager.calculate_checksum(local_file)
-            size = local_file.stat().st_size
-            
-            # Mettre à jour l'état
-            self.state_manager.update_state(
-                filename,
-                server.name,
-                status="copied",
-                checksum=checksum,
-                copy_retry_count=0,  # Reset après succès
-                size=size,
-            )
-            
-            logger.info(
-                f"File collected successfully: {local_file}",
-                extra={"server": server.name, "file": filename, "operation": "copy"},
+            local_file = self.retry_operation.execute(
+                self._copy_file, server, remote_path, local_dest
             )
             
-            return local_file
+            return self._record_copy(server, filename, local_file, state=state)
             
         except Exception as e:
             # Déplacer vers error/copy en cas d'échec définitif
             error_dir = self.config.data_root / "error" / "copy" / server.name
-            error_dir.mkdir(parents=True, exist_ok=True)
+            self.config.ensure_server_dirs(server.name)
             
-            if local_file.exists():
-                error_file = error_dir / filename
-                if error_file.exists():
-                    error_file.unlink()  # Supprimer l'ancien fichier d'erreur
-                local_file.rename(error_file)
+            error_file = error_dir / filename
+            try:
+                # replace() écrase atomiquement un éventuel ancien fichier d'erreur
+                local_file.replace(error_file)
+            except FileNotFoundError:
+                pass
+            else:
                 logger.error(
                     f"File moved to error/copy: {error_file}",
                     extra={
@@ -293,12 +757,7 @@ class Collector:
                 )
             
             # Mettre à jour l'état
-            self.state_manager.update_state(
-                filename,
-                server.name,
-                status="error",
-                error_type="copy",
-            )
+            self.state_manager.patch_state(state, status="error", error_type="copy")
             
             logger.error(
                 f"Failed to collect file {filename} from {server.name}: {str(e)}",
@@ -333,42 +792,61 @@ class Collector:
         # Construire la commande distante pour lister les fichiers.
         # On utilise `find base_dir -maxdepth 1 -type f -name pattern`
         # pour supporter un pattern comme *.log.gz de façon sûre.
-        remote_find_cmd = (
+        # -printf ajoute taille et mtime dans le même aller-retour ; les find
+        # sans -printf (non GNU) retombent sur la liste simple des chemins.
+        find_base = (
             f"find {shlex.quote(base_dir)} -maxdepth 1 -type f -name {shlex.quote(pattern)}"
         )
+        remote_find_cmd = (
+            f"{find_base} -printf '%p\\t%s\\t%T@\\n' 2>/dev/null || {find_base}"
+        )
 
         ssh_cmd = self._build_ssh_base_cmd(server) + [
             f"{server.user}@{server.host}",
             remote_find_cmd,
         ]
 
-        logger.debug(
-            f"Listing remote files with: {' '.join(ssh_cmd)}",
-            extra={"server": server.name, "operation": "list_remote"},
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Listing remote files with: %s",
+                _format_cmd(ssh_cmd),
+                extra={"server": server.name, "operation": "list_remote"},
+            )
 
         try:
             result = subprocess.run(
                 ssh_cmd,
-                capture_output=True,
-                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 timeout=self.config.rsync.timeout + 10,
                 env=self._subprocess_env(server),
             )
 
             if result.returncode != 0:
-                error_msg = result.stderr or result.stdout or "Unknown ssh error"
+                error_msg = (
+                    result.stderr.decode("utf-8", errors="replace").strip()
+                    or "Unknown ssh error"
+                )
                 logger.error(
                     f"Failed to list remote files on {server.name}: {error_msg}",
                     extra={"server": server.name, "operation": "list_remote"},
                 )
                 return []
 
-            remote_files = [
-                line.strip()
-                for line in result.stdout.splitlines()
-                if line.strip()
-            ]
+            remote_files: List[RemoteFile] = []
+            for line in os.fsdecode(result.stdout).splitlines():
+                if not line.strip():
+                    continue
+                fields = line.split("\t")
+                if len(fields) == 3:
+                    try:
+                        remote_files.append(
+                            RemoteFile(fields[0], int(fields[1]), float(fields[2]))
+                        )
+                        continue
+                    except ValueError:
+                        pass
+                remote_files.append(RemoteFile(line.strip()))
 
             if not remote_files:
                 logger.info(
@@ -382,11 +860,111 @@ class Collector:
                 extra={"server": server.name, "operation": "list_remote"},
             )
 
-            collected: List[Path] = []
-            for remote_file in remote_files:
-                local = self.collect_file(server, remote_file)
-                if local:
-                    collected.append(local)
+            local_dest = self.config.data_root / "incoming" / server.name
+
+            workers = max(1, self.config.rsync.parallel)
+            dir_snapshot = self._snapshot_dir(local_dest)
+            states_map = self.state_manager.get_states_bulk(
+                server.name, [rf.name for rf in remote_files]
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Écarter les fichiers déjà collectés avant le transfert groupé
+                def check(remote_file: RemoteFile) -> Tuple[RemoteFile, bool, Optional[Path]]:
+                    filename = remote_file.name
+                    state = states_map.get(filename)
+                    if self._recently_failed(server, filename, state):
+                        return remote_file, True, None
+                    skip, existing = self._existing_copy(
+                        server, filename, local_dest / filename, state, dir_snapshot, remote_file
+                    )
+                    return remote_file, skip, existing
+
+                collected: List[Path] = []
+                pending: List[RemoteFile] = []
+                for remote_file, skip, existing in executor.map(check, remote_files):
+                    if not skip:
+                        pending.append(remote_file)
+                    elif existing:
+                        collected.append(existing)
+
+                def record(remote_file: RemoteFile) -> Optional[Path]:
+                    filename = remote_file.name
+                    try:
+                        return self._record_copy(
+                            server,
+                            filename,
+                            local_dest / filename,
+                            remote_file.size,
+                            state=states_map.get(filename),
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            f"Failed to record batch copy of {filename}, retrying: {e}",
+                            extra={"server": server.name, "file": filename, "operation": "copy"},
+                        )
+                    return self.collect_file(
+                        server, remote_file.path, states_map=states_map, remote=remote_file
+                    )
+
+                # Le checksum de chaque fichier reçu est calculé pendant que rsync
+                # transfère les suivants
+                by_name = {rf.name: rf for rf in pending}
+                futures: Dict[str, Future] = {}
+
+                def on_copied(filename: str) -> None:
+                    if filename not in futures:
+                        futures[filename] = executor.submit(record, by_name[filename])
+
+                batch_copied: Set[str] = set()
+                if len(pending) > 1:
+                    try:
+                        batch_copied = self.retry_operation.execute(
+                            self._copy_files_batch,
+                            server,
+                            [rf.path for rf in pending],
+                            local_dest,
+                            on_copied,
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            f"Batch copy failed on {server.name}, falling back to per-file copy: {e}",
+                            extra={"server": server.name, "operation": "copy"},
+                        )
+
+                # Les fichiers non transférés par le lot sont recopiés un par un (avec retry)
+                for remote_file in pending:
+                    filename = remote_file.name
+                    if filename in futures:
+                        continue
+                    if filename in batch_copied:
+                        futures[filename] = executor.submit(record, remote_file)
+                    else:
+                        futures[filename] = executor.submit(
+                            self.collect_file,
+                            server,
+                            remote_file.path,
+                            states_map=states_map,
+                            remote=remote_file,
+                        )
+
+                for remote_file in pending:
+                    # Une erreur inattendue sur un fichier ne doit pas perdre les autres
+                    try:
+                        local = futures[remote_file.name].result()
+                    except Exception as e:
+                        logger.error(
+                            f"Unexpected error while collecting {remote_file.name} "
+                            f"from {server.name}: {e}",
+                            extra={
+                                "server": server.name,
+                                "file": remote_file.name,
+                                "operation": "copy",
+                            },
+                            exc_info=True,
+                        )
+                        continue
+                    if local:
+                        collected.append(local)
 
             return collected
 
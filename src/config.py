@@ -1,10 +1,21 @@
 """Gestion de la configuration du pipeline."""
 import os
 import json
+import re
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, field
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Lignes de commentaire (# en début de ligne, après d'éventuels blancs)
+_COMMENT_RE = re.compile(rb"(?m)^[^\S\n]*#[^\n]*\n?")
 
 # Permissions par défaut des répertoires (rwxr-xr-x), appliquées sur Unix uniquement
 _DEFAULT_DIR_MODE = 0o755
@@ -20,6 +31,32 @@ def _ensure_dir(path: Path, mode: int = _DEFAULT_DIR_MODE) -> None:
             pass
 
 
+def _ensure_dirs(paths: List[Path]) -> None:
+    """
+    Crée les répertoires manquants d'une liste (parents avant enfants).
+
+    Chaque répertoire parent est listé une seule fois (os.scandir) et seuls
+    les répertoires manquants sont créés : quand tout existe déjà, aucun
+    mkdir/chmod n'est émis.
+    """
+    # Sous-répertoires existants, par répertoire parent
+    existing: Dict[Path, Set[str]] = {}
+    for path in paths:
+        names = existing.get(path.parent)
+        if names is None:
+            try:
+                with os.scandir(path.parent) as entries:
+                    names = {entry.name for entry in entries if entry.is_dir()}
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+            existing[path.parent] = names
+        if path.name not in names:
+            _ensure_dir(path)
+            names.add(path.name)
+            # Répertoire tout juste créé : vide, inutile de le lister
+            existing.setdefault(path, set())
+
+
 def _layout_from_root(root_dir: Path) -> dict:
     """Dérive l'arborescence standard à partir de ROOT_DIR."""
     return {
@@ -46,7 +83,12 @@ class RetryConfig:
 class RsyncConfig:
     """Configuration pour rsync."""
     timeout: int = 300
+    # -z/--compress est retiré automatiquement pour les fichiers déjà compressés
+    # (.gz, .bz2, .xz, .zst...) : seuls les fichiers texte sont compressés en transit
     options: str = "-avz --partial"
+    parallel: int = 4  # Nombre de fichiers traités en parallèle par serveur
+    # Transfert incrémental des fichiers en croissance (--append-verify --inplace)
+    append_mode: bool = False
 
 
 @dataclass
@@ -54,6 +96,16 @@ class ExtractConfig:
     """Configuration pour l'extraction."""
     validate_gzip: bool = True
     delete_source: bool = False
+    # Checksum des fichiers extraits : sha256 ou blake3 (paquet optionnel)
+    checksum_algo: str = "sha256"
+
+
+@dataclass
+class StateConfig:
+    """Configuration de la gestion d'état."""
+    # Écrire l'état "copied" (compteur de retry) avant chaque extraction, en plus
+    # de l'état final : plus sûr en cas d'arrêt brutal, mais deux écritures par fichier
+    checkpoint: bool = False
 
 
 @dataclass
@@ -75,6 +127,7 @@ class ServerConfig:
     remote_path: str
     enabled: bool = True
     password: Optional[str] = None
+    append_mode: Optional[bool] = None  # Surcharge de RsyncConfig.append_mode
 
 
 @dataclass
@@ -105,8 +158,14 @@ class Config:
     rsync: RsyncConfig = field(default_factory=RsyncConfig)
     extract: ExtractConfig = field(default_factory=ExtractConfig)
     log: LogConfig = field(default_factory=LogConfig)
+    state: StateConfig = field(default_factory=StateConfig)
     pipeline: PipelineConfig = field(default_factory=PipelineConfig)
     servers: List[ServerConfig] = field(default_factory=list)
+    # Serveurs dont les répertoires ont déjà été créés (voir ensure_server_dirs)
+    _server_dirs: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+    _server_dirs_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
 
     @property
     def share_dir(self) -> Path:
@@ -114,21 +173,49 @@ class Config:
         return self.inputs_dir
 
     def __post_init__(self):
-        """Crée ROOT_DIR et toute l'arborescence nécessaire."""
-        for path in (self.root_dir, self.inputs_dir, self.data_root, self.state_dir, self.log_dir, self.tmp_dir):
-            _ensure_dir(path)
+        """
+        Crée ROOT_DIR et l'arborescence commune.
+
+        Les répertoires propres à chaque serveur sont créés à la première
+        utilisation (voir ensure_server_dirs).
+        """
+        needed = [self.root_dir, self.inputs_dir, self.data_root, self.state_dir, self.log_dir, self.tmp_dir]
 
         for stage in ["incoming", "extracted", "processed", "error"]:
-            _ensure_dir(self.data_root / stage)
-            if stage == "error":
-                for error_type in ["copy", "extract", "quarantine"]:
-                    _ensure_dir(self.data_root / stage / error_type)
-
-        for server in self.servers:
-            for stage in ["incoming", "extracted", "processed"]:
-                _ensure_dir(self.data_root / stage / server.name)
+            needed.append(self.data_root / stage)
+        for error_type in ["copy", "extract", "quarantine"]:
+            needed.append(self.data_root / "error" / error_type)
+
+        _ensure_dirs(needed)
+
+    def ensure_server_dirs(self, server_name: str) -> None:
+        """
+        Crée les répertoires incoming/extracted/processed/error/* d'un serveur,
+        une seule fois par processus.
+
+        Args:
+            server_name: Nom du serveur.
+        """
+        if server_name in self._server_dirs:
+            return
+        with self._server_dirs_lock:
+            if server_name in self._server_dirs:
+                return
+            needed = [self.data_root / stage / server_name for stage in ["incoming", "extracted", "processed"]]
             for error_type in ["copy", "extract", "quarantine"]:
-                _ensure_dir(self.data_root / "error" / error_type / server.name)
+                needed.append(self.data_root / "error" / error_type / server_name)
+            _ensure_dirs(needed)
+            self._server_dirs.add(server_name)
+
+
+def _env_password(env: dict, server_name: str) -> Optional[str]:
+    """
+    Mot de passe SSH d'un serveur issu de l'environnement (.env inclus).
+
+    SSH_PASSWORD_<NOM_SERVEUR> est prioritaire sur SSH_PASSWORD.
+    """
+    env_key = f"SSH_PASSWORD_{server_name.upper().replace('-', '_')}"
+    return env.get(env_key, "").strip() or env.get("SSH_PASSWORD", "").strip() or None
 
 
 def load_config(config_dir: Optional[Path] = None) -> Config:
@@ -149,20 +236,21 @@ def load_config(config_dir: Optional[Path] = None) -> Config:
     
     config_dir = Path(config_dir)
     
-    # Charger .env
+    # Charger .env une seule fois dans un dict ; les variables d'environnement
+    # du processus restent prioritaires (comme avec load_dotenv)
     env_file = config_dir / ".env"
-    if env_file.exists():
-        load_dotenv(env_file)
-    else:
+    if not env_file.exists():
         # Essayer env.example en fallback
-        env_example = config_dir / "env.example"
-        if env_example.exists():
-            load_dotenv(env_example)
+        env_file = config_dir / "env.example"
+    env = {}
+    if env_file.exists():
+        env = {k: v for k, v in dotenv_values(env_file).items() if v is not None}
+    env.update(os.environ)
     
     project_root = Path(__file__).parent.parent
     default_root = project_root / "data"
 
-    root_dir_env = os.getenv("ROOT_DIR", "").strip()
+    root_dir_env = env.get("ROOT_DIR", "").strip()
     if root_dir_env:
         layout = _layout_from_root(Path(root_dir_env))
     else:
@@ -170,32 +258,40 @@ def load_config(config_dir: Optional[Path] = None) -> Config:
     
     # Configuration retry
     retry = RetryConfig(
-        max_retry_copy=int(os.getenv("MAX_RETRY_COPY", "3")),
-        max_retry_extract=int(os.getenv("MAX_RETRY_EXTRACT", "3")),
-        delay_base=int(os.getenv("RETRY_DELAY_BASE", "60")),
-        delay_max=int(os.getenv("RETRY_DELAY_MAX", "3600")),
-        backoff_multiplier=float(os.getenv("RETRY_BACKOFF_MULTIPLIER", "2.0")),
+        max_retry_copy=int(env.get("MAX_RETRY_COPY", "3")),
+        max_retry_extract=int(env.get("MAX_RETRY_EXTRACT", "3")),
+        delay_base=int(env.get("RETRY_DELAY_BASE", "60")),
+        delay_max=int(env.get("RETRY_DELAY_MAX", "3600")),
+        backoff_multiplier=float(env.get("RETRY_BACKOFF_MULTIPLIER", "2.0")),
     )
     
     # Configuration rsync
     rsync = RsyncConfig(
-        timeout=int(os.getenv("RSYNC_TIMEOUT", "300")),
-        options=os.getenv("RSYNC_OPTIONS", "-avz --partial"),
+        timeout=int(env.get("RSYNC_TIMEOUT", "300")),
+        options=env.get("RSYNC_OPTIONS", "-avz --partial"),
+        parallel=int(env.get("RSYNC_PARALLEL", "4")),
+        append_mode=env.get("RSYNC_APPEND_MODE", "False").lower() == "true",
     )
     
     # Configuration extraction
     extract = ExtractConfig(
-        validate_gzip=os.getenv("GZIP_VALIDATE", "True").lower() == "true",
-        delete_source=os.getenv("EXTRACT_DELETE_SOURCE", "False").lower() == "true",
+        validate_gzip=env.get("GZIP_VALIDATE", "True").lower() == "true",
+        delete_source=env.get("EXTRACT_DELETE_SOURCE", "False").lower() == "true",
+        checksum_algo=env.get("CHECKSUM_ALGO", "sha256").strip().lower(),
+    )
+    
+    # Configuration état
+    state = StateConfig(
+        checkpoint=env.get("STATE_CHECKPOINT", "False").lower() == "true",
     )
     
     # Configuration logging
     log = LogConfig(
-        level=os.getenv("LOG_LEVEL", "INFO"),
-        format=os.getenv("LOG_FORMAT", "json"),
-        rotation=os.getenv("LOG_ROTATION", "True").lower() == "true",
-        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
-        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        level=env.get("LOG_LEVEL", "INFO"),
+        format=env.get("LOG_FORMAT", "json"),
+        rotation=env.get("LOG_ROTATION", "True").lower() == "true",
+        max_bytes=int(env.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backup_count=int(env.get("LOG_BACKUP_COUNT", "5")),
     )
     
     def _load_json_allow_comments(path: Path) -> dict:
@@ -205,17 +301,10 @@ def load_config(config_dir: Optional[Path] = None) -> Config:
         Cela permet d'utiliser des fichiers .conf avec des commentaires en tête.
         """
         try:
-            with open(path, "r") as f:
-                lines = []
-                for line in f:
-                    stripped = line.lstrip()
-                    if stripped.startswith("#") or stripped == "":
-                        continue
-                    lines.append(line)
-            content = "".join(lines).strip()
+            content = _COMMENT_RE.sub(b"", path.read_bytes()).strip()
             if not content:
                 return {}
-            return json.loads(content)
+            return _json_loads(content)
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in config file {path}: {e}") from e
 
@@ -256,7 +345,8 @@ def load_config(config_dir: Optional[Path] = None) -> Config:
                 user=server_data["user"],
                 remote_path=server_data["remote_path"],
                 enabled=server_data.get("enabled", True),
-                password=server_data.get("password") or None,
+                password=server_data.get("password") or _env_password(env, server_data["name"]),
+                append_mode=server_data.get("append_mode"),
             ))
     
     config = Config(
@@ -265,6 +355,7 @@ def load_config(config_dir: Optional[Path] = None) -> Config:
         rsync=rsync,
         extract=extract,
         log=log,
+        state=state,
         pipeline=pipeline,
         servers=servers,
     )
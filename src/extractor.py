@@ -1,16 +1,78 @@
 """Module d'extraction des fichiers gzip."""
-import gzip
+import errno
+import logging
+import mmap
+import os
+import queue
 import shutil
+import tempfile
+import threading
+import time
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional
 
 from .config import Config, _ensure_dir
 from .retry import RetryableOperation
-from .state import StateManager
+from .state import StateManager, checksum_factory
 from .logger import get_logger
 
 logger = get_logger()
 
+# Décompression accélérée par ISA-L si le paquet optionnel isal est installé
+try:
+    from isal import igzip as gzip_mod
+except ImportError:
+    import gzip as gzip_mod
+
+# Taille des blocs lus/écrits : amortit le coût des appels Python par bloc
+_READ_BLOCK_SIZE = 1 << 20
+
+# Sans isal : décompression zlib directe, sans la couche Python de GzipFile
+_USE_RAW_ZLIB = gzip_mod.__name__ == "gzip"
+
+# Taille des blocs compressés lus par _raw_gunzip, et des tranches passées à zlib
+_RAW_READ_SIZE = 4 << 20
+_FEED_SIZE = 128 << 10
+
+# Au-delà de cette taille, le fichier compressé est lu via mmap
+_MMAP_MIN_SIZE = 16 << 20
+
+# wbits zlib pour un flux gzip (en-tête et CRC/taille vérifiés par zlib)
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class _BufferPool:
+    """
+    Tampons de lecture réutilisés d'un fichier à l'autre, par taille (LIFO : le
+    dernier rendu, encore chaud en cache, est le premier resservi). Chaque
+    Extractor possède le sien, borné à max_concurrent_extractions par taille.
+    """
+
+    def __init__(self, max_per_size: int):
+        self.max_per_size = max(1, max_per_size)
+        self._pools: Dict[int, "queue.LifoQueue[bytearray]"] = {
+            _READ_BLOCK_SIZE: queue.LifoQueue(),
+            _RAW_READ_SIZE: queue.LifoQueue(),
+        }
+
+    def get(self, size: int) -> bytearray:
+        """Prend un tampon de la taille demandée dans le pool (ou en alloue un)."""
+        try:
+            return self._pools[size].get_nowait()
+        except queue.Empty:
+            return bytearray(size)
+
+    def put(self, buf: bytearray) -> None:
+        """Rend un tampon au pool, sauf si celui-ci est plein."""
+        pool = self._pools[len(buf)]
+        if pool.qsize() < self.max_per_size:
+            pool.put_nowait(buf)
+
+
+# Noyau de décompression : (source, destination, pool de tampons)
+_Kernel = Callable[[str, str, _BufferPool], None]
+
 
 class ExtractError(Exception):
     """Exception pour erreurs d'extraction."""
@@ -22,6 +84,244 @@ class CorruptionError(ExtractError):
     pass
 
 
+def _igzip_extract(src: str, dst: str, pool: _BufferPool) -> None:
+    """
+    Décompresse src vers dst via gzip_mod.open (isal si disponible).
+
+    Raises:
+        CorruptionError: Si le flux gzip est invalide ou tronqué.
+    """
+    # Un seul tampon réutilisé (readinto) : pas de nouvel objet bytes par bloc
+    buffer = pool.get(_READ_BLOCK_SIZE)
+    view = memoryview(buffer)
+    try:
+        with gzip_mod.open(src, "rb") as f_in:
+            with open(dst, "wb") as f_out:
+                while True:
+                    try:
+                        n = f_in.readinto(buffer)
+                    except (gzip_mod.BadGzipFile, OSError, EOFError) as e:
+                        raise CorruptionError(f"Gzip file is corrupted: {str(e)}")
+                    if not n:
+                        break
+                    f_out.write(view[:n])
+    finally:
+        view.release()
+        pool.put(buffer)
+
+
+def _gunzip_chunks(chunks: Iterable[memoryview], f_out: BinaryIO) -> None:
+    """
+    Décompresse un flux gzip fourni par blocs et écrit le résultat dans f_out.
+
+    Chaque bloc est passé à zlib par tranches de _FEED_SIZE : la sortie de
+    chaque appel est bornée (max_length) pour ne pas exploser en mémoire sur
+    un fichier très compressible, sans recopier à chaque appel un gros reste
+    d'entrée (unconsumed_tail). Comme gzip.open, gère les fichiers
+    multi-membres (gzip concaténés) et le bourrage final par des zéros.
+
+    Raises:
+        CorruptionError: Si le flux gzip est invalide ou tronqué.
+    """
+    decomp = zlib.decompressobj(_GZIP_WBITS)
+    in_member = False
+    chunk = data = None
+    try:
+        for chunk in chunks:
+            for offset in range(0, len(chunk), _FEED_SIZE):
+                data = chunk[offset:offset + _FEED_SIZE]
+                while data:
+                    if not in_member:
+                        # Début de membre : ignorer le bourrage par des zéros
+                        if data[0] == 0:
+                            data = bytes(data).lstrip(b"\x00")
+                            if not data:
+                                break
+                        in_member = True
+                    try:
+                        f_out.write(decomp.decompress(data, _READ_BLOCK_SIZE))
+                    except zlib.error as e:
+                        raise CorruptionError(f"Gzip file is corrupted: {str(e)}")
+                    if decomp.eof:
+                        # Fin de membre : la suite éventuelle est un nouveau membre
+                        data = decomp.unused_data
+                        decomp = zlib.decompressobj(_GZIP_WBITS)
+                        in_member = False
+                    else:
+                        data = decomp.unconsumed_tail
+    finally:
+        # Ne garder aucune vue sur le tampon source (un mmap ne peut pas être
+        # fermé tant qu'une vue existe)
+        chunk = data = None
+    if in_member:
+        try:
+            f_out.write(decomp.flush())
+        except zlib.error as e:
+            raise CorruptionError(f"Gzip file is corrupted: {str(e)}")
+        if not decomp.eof:
+            raise CorruptionError(
+                "Gzip file is corrupted: Compressed file ended before the "
+                "end-of-stream marker was reached"
+            )
+
+
+def _read_chunks(f_in: BinaryIO, buffer: bytearray) -> Iterator[memoryview]:
+    """Lit f_in par blocs dans un tampon réutilisé (chaque vue est valable jusqu'au bloc suivant)."""
+    view = memoryview(buffer)
+    while True:
+        n = f_in.readinto(buffer)
+        if not n:
+            return
+        yield view[:n]
+
+
+def _raw_gunzip(src: str, dst: str, pool: _BufferPool) -> None:
+    """
+    Décompresse src vers dst directement avec zlib.decompressobj.
+
+    Au-delà de 16 Mio, le fichier compressé est projeté en mémoire (mmap,
+    lecture séquentielle annoncée au noyau) et zlib lit directement les pages,
+    sans copie intermédiaire ; sinon il est lu par blocs de 4 Mio dans un
+    tampon réutilisé.
+
+    Raises:
+        CorruptionError: Si le flux gzip est invalide ou tronqué.
+    """
+    with open(src, "rb", buffering=0) as f_in, open(dst, "wb") as f_out:
+        size = os.fstat(f_in.fileno()).st_size
+        if size < _MMAP_MIN_SIZE:
+            buffer = pool.get(_RAW_READ_SIZE)
+            try:
+                _gunzip_chunks(_read_chunks(f_in, buffer), f_out)
+            finally:
+                pool.put(buffer)
+            return
+        with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                _gunzip_chunks(
+                    (view[i:i + _RAW_READ_SIZE] for i in range(0, size, _RAW_READ_SIZE)),
+                    f_out,
+                )
+            finally:
+                view.release()
+
+
+# Noyaux de décompression interchangeables (même signature, mêmes erreurs)
+_KERNELS: Dict[str, _Kernel] = {
+    "raw_zlib": _raw_gunzip,
+    "gzip_stream": _igzip_extract,
+}
+_DEFAULT_KERNEL = "raw_zlib" if _USE_RAW_ZLIB else "gzip_stream"
+
+# Taille minimale d'un fichier pour mesurer les noyaux (en dessous, trop bruité)
+_PROBE_MIN_SIZE = 1 << 20
+
+# Volume de sortie décompressé pour la mesure (préfixe du fichier seulement)
+_PROBE_OUTPUT_SIZE = 8 << 20
+
+
+def _probe_raw_zlib(src: str, pool: _BufferPool) -> None:
+    """Décompresse (sans écrire) au plus _PROBE_OUTPUT_SIZE octets de src avec zlib."""
+    decomp = zlib.decompressobj(_GZIP_WBITS)
+    remaining = _PROBE_OUTPUT_SIZE
+    buffer = pool.get(_RAW_READ_SIZE)
+    try:
+        with open(src, "rb", buffering=0) as f_in:
+            for chunk in _read_chunks(f_in, buffer):
+                for offset in range(0, len(chunk), _FEED_SIZE):
+                    data = chunk[offset:offset + _FEED_SIZE]
+                    while data and remaining > 0 and not decomp.eof:
+                        remaining -= len(decomp.decompress(data, min(remaining, _READ_BLOCK_SIZE)))
+                        data = decomp.unconsumed_tail
+                    if remaining <= 0 or decomp.eof:
+                        return
+    finally:
+        pool.put(buffer)
+
+
+def _probe_gzip_stream(src: str, pool: _BufferPool) -> None:
+    """Décompresse (sans écrire) au plus _PROBE_OUTPUT_SIZE octets de src via gzip_mod."""
+    remaining = _PROBE_OUTPUT_SIZE
+    buffer = pool.get(_READ_BLOCK_SIZE)
+    try:
+        with gzip_mod.open(src, "rb") as f_in:
+            while remaining > 0:
+                n = f_in.readinto(buffer)
+                if not n:
+                    return
+                remaining -= n
+    finally:
+        pool.put(buffer)
+
+
+# Mesure bornée associée à chaque noyau de _KERNELS
+_PROBES: Dict[str, Callable[[str, _BufferPool], None]] = {
+    "raw_zlib": _probe_raw_zlib,
+    "gzip_stream": _probe_gzip_stream,
+}
+
+
+def _copy_file_data(src: str, dst: str) -> None:
+    """
+    Copie le contenu de src vers dst, dans le noyau quand c'est possible.
+
+    copy_file_range permet au système de fichiers de cloner les blocs
+    (reflink sur XFS/Btrfs) ; à défaut, shutil.copyfile (sendfile sous Linux).
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+                in_fd, out_fd = f_in.fileno(), f_out.fileno()
+                while os.copy_file_range(in_fd, out_fd, 1 << 30):
+                    pass
+            return
+        except OSError as e:
+            # Noyau trop ancien ou paire de systèmes de fichiers non supportée
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    shutil.copyfile(src, dst)
+
+
+def _discard(path: str) -> None:
+    """Supprime un fichier s'il existe."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _fast_move(src: str, dst: str) -> None:
+    """
+    Déplace src vers dst en écrasant atomiquement une éventuelle cible.
+
+    Sur un même système de fichiers, simple os.replace. Entre deux systèmes
+    de fichiers (EXDEV), copie vers un fichier temporaire à côté de dst,
+    renommage atomique puis suppression de src.
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp = f"{dst}.part"
+    try:
+        _copy_file_data(src, tmp)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    os.unlink(src)
+
+
 class Extractor:
     """Extracteur de fichiers gzip."""
     
@@ -35,15 +335,41 @@ class Extractor:
         """
         self.config = config
         self.state_manager = state_manager
+        # Chemins manipulés en str (os.path) sur le chemin critique de l'extraction
+        self._data_root = str(config.data_root)
         self.retry_operation = RetryableOperation(
             max_retries=config.retry.max_retry_extract,
             config=config.retry,
             operation_name="extract",
         )
+        
+        # Tampons de lecture conservés : autant que d'extractions simultanées
+        self._buf_pool = _BufferPool(config.pipeline.max_concurrent_extractions)
+        
+        # Noyau de décompression retenu par serveur (voir _kernel_for)
+        self._strategy_cache: Dict[str, _Kernel] = {}
+        # Verrou court protégeant _probe_locks ; un verrou de mesure par serveur
+        self._strategy_lock = threading.Lock()
+        self._probe_locks: Dict[str, threading.Lock] = {}
+        
+        # Algorithme de checksum des fichiers extraits (repli sur sha256 si
+        # blake3 est demandé sans être installé)
+        self.checksum_algo = config.extract.checksum_algo
+        try:
+            checksum_factory(self.checksum_algo)
+        except ValueError as e:
+            logger.warning(
+                f"{e}, falling back to sha256",
+                extra={"operation": "extract"},
+            )
+            self.checksum_algo = "sha256"
     
     def _validate_gzip(self, filepath: Path) -> bool:
         """
-        Valide qu'un fichier gzip n'est pas corrompu.
+        Valide qu'un fichier gzip n'est pas corrompu, sans l'extraire.
+
+        L'extraction n'en a pas besoin : elle détecte la corruption pendant
+        sa propre décompression.
         
         Args:
             filepath: Chemin du fichier à valider.
@@ -55,23 +381,82 @@ class Extractor:
             CorruptionError: Si le fichier est corrompu.
         """
         try:
-            with gzip.open(filepath, "rb") as f:
+            with gzip_mod.open(filepath, "rb") as f:
                 # Tenter de lire tout le fichier pour détecter la corruption
-                while f.read(8192):
+                while f.read(_READ_BLOCK_SIZE):
                     pass
             return True
-        except (gzip.BadGzipFile, OSError, EOFError) as e:
+        except (gzip_mod.BadGzipFile, OSError, EOFError) as e:
             raise CorruptionError(f"Gzip file is corrupted: {str(e)}")
         except Exception as e:
             raise CorruptionError(f"Error validating gzip file: {str(e)}")
     
-    def _extract_file(self, gzip_file: Path, dest_dir: Path) -> Path:
+    def _probe_kernel(self, server: str, gzip_file: str) -> Optional[_Kernel]:
+        """
+        Mesure chaque noyau de décompression sur le début d'un fichier (au plus
+        _PROBE_OUTPUT_SIZE octets décompressés, sans écriture) et retourne le
+        plus rapide, ou None si le fichier est illisible.
+        """
+        timings: Dict[str, float] = {}
+        for name, probe in _PROBES.items():
+            start = time.perf_counter()
+            try:
+                probe(gzip_file, self._buf_pool)
+            except Exception:
+                return None
+            timings[name] = time.perf_counter() - start
+        
+        best = min(timings, key=timings.get)
+        logger.info(
+            f"Extraction strategy for {server}: {best} ("
+            + ", ".join(f"{name}={elapsed:.3f}s" for name, elapsed in timings.items())
+            + ")",
+            extra={"server": server, "operation": "extract"},
+        )
+        return _KERNELS[best]
+    
+    def _kernel_for(self, server: str, gzip_file: str) -> _Kernel:
+        """
+        Noyau de décompression à utiliser pour un serveur.
+        
+        Les fichiers d'un même serveur se ressemblent (niveau de compression,
+        taille) : le début du premier fichier assez gros sert à mesurer les
+        noyaux disponibles, et le gagnant est mémorisé pour la suite du run.
+        """
+        kernel = self._strategy_cache.get(server)
+        if kernel is not None:
+            return kernel
+        try:
+            if os.stat(gzip_file).st_size < _PROBE_MIN_SIZE:
+                return _KERNELS[_DEFAULT_KERNEL]
+        except OSError:
+            return _KERNELS[_DEFAULT_KERNEL]
+        
+        # Les serveurs mesurent en parallèle ; un seul thread par serveur
+        with self._strategy_lock:
+            probe_lock = self._probe_locks.setdefault(server, threading.Lock())
+        with probe_lock:
+            kernel = self._strategy_cache.get(server)
+            if kernel is None:
+                kernel = self._probe_kernel(server, gzip_file)
+                if kernel is None:
+                    return _KERNELS[_DEFAULT_KERNEL]
+                self._strategy_cache[server] = kernel
+        return kernel
+    
+    def _extract_file(
+        self,
+        gzip_file: str,
+        extracted_path: str,
+        kernel: Optional[_Kernel] = None,
+    ) -> str:
         """
         Extrait un fichier gzip.
         
         Args:
             gzip_file: Chemin du fichier gzip.
-            dest_dir: Répertoire de destination.
+            extracted_path: Chemin du fichier extrait.
+            kernel: Noyau de décompression (par défaut celui du module gzip utilisé).
         
         Returns:
             Chemin du fichier extrait.
@@ -80,102 +465,125 @@ class Extractor:
             ExtractError: Si l'extraction échoue.
             CorruptionError: Si le fichier est corrompu.
         """
-        # Valider le fichier gzip si demandé
-        if self.config.extract.validate_gzip:
-            self._validate_gzip(gzip_file)
-        
-        # S'assurer que le répertoire de destination existe
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Nom du fichier extrait (sans .gz)
-        extracted_name = gzip_file.stem
-        extracted_path = dest_dir / extracted_name
-        
         # Si le fichier extrait existe déjà, le supprimer
-        if extracted_path.exists():
-            extracted_path.unlink()
+        try:
+            os.unlink(extracted_path)
+        except FileNotFoundError:
+            pass
         
         try:
-            # Extraire le fichier
-            with gzip.open(gzip_file, "rb") as f_in:
-                with open(extracted_path, "wb") as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+            # Extraire le fichier en une seule passe : une erreur de décompression
+            # signale un fichier corrompu (validation et extraction fusionnées)
+            (kernel or _KERNELS[_DEFAULT_KERNEL])(gzip_file, extracted_path, self._buf_pool)
             
-            logger.info(
-                f"File extracted successfully: {extracted_path}",
-                extra={
-                    "file": str(extracted_path),
-                    "source": str(gzip_file),
-                    "operation": "extract",
-                },
-            )
+            # Le succès est journalisé au niveau INFO par extract_file
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Decompressed {gzip_file} to {extracted_path}",
+                    extra={
+                        "file": extracted_path,
+                        "source": gzip_file,
+                        "operation": "extract",
+                    },
+                )
             
             return extracted_path
             
-        except CorruptionError:
-            raise
+        except CorruptionError as e:
+            try:
+                os.unlink(extracted_path)
+            except FileNotFoundError:
+                pass
+            if self.config.extract.validate_gzip:
+                raise
+            # Sans validation, un fichier illisible reste une erreur d'extraction
+            raise ExtractError(f"Error extracting file: {str(e)}")
         except Exception as e:
             raise ExtractError(f"Error extracting file: {str(e)}")
     
-    def extract_file(self, gzip_file: Path, server: str) -> Optional[Path]:
+    def extract_file(
+        self, gzip_file: Path, server: str, dest_dir: Optional[Path] = None
+    ) -> Optional[Path]:
         """
         Extrait un fichier gzip avec retry.
+
+        La décompression écrit dans un fichier .part unique (caché) à côté
+        de la cible, renommé atomiquement une fois complet.
         
         Args:
             gzip_file: Chemin du fichier gzip à extraire.
             server: Nom du serveur source.
+            dest_dir: Répertoire de destination (par défaut extracted/<serveur>).
         
         Returns:
             Chemin du fichier extrait ou None si échec après retries.
         """
-        if not gzip_file.exists():
+        src = os.fspath(gzip_file)
+        if not os.path.exists(src):
             logger.error(
-                f"Gzip file does not exist: {gzip_file}",
-                extra={"file": str(gzip_file), "operation": "extract"},
+                f"Gzip file does not exist: {src}",
+                extra={"file": src, "operation": "extract"},
             )
             return None
         
-        filename = gzip_file.name
-        dest_dir = self.config.data_root / "extracted" / server
+        filename = os.path.basename(src)
+        if dest_dir is None:
+            out_dir = os.path.join(self._data_root, "extracted", server)
+        else:
+            out_dir = os.fspath(dest_dir)
+        # Nom du fichier extrait (sans .gz)
+        extracted_name = os.path.splitext(filename)[0]
+        extracted_path = os.path.join(out_dir, extracted_name)
+        # Fichier de travail unique par appel (créé dans le try) : deux serveurs
+        # peuvent extraire simultanément un fichier de même nom dans inputs/
+        work_path = None
         
         # Vérifier l'état actuel
         state = self.state_manager.get_state(filename, server)
         
         # Si le fichier est déjà extrait, vérifier qu'il existe toujours
         if state and state.status == "extracted":
-            extracted_name = gzip_file.stem
-            extracted_path = dest_dir / extracted_name
-            if extracted_path.exists():
-                logger.debug(
-                    f"File {filename} already extracted",
-                    extra={"server": server, "file": filename, "operation": "extract"},
-                )
-                return extracted_path
+            if os.path.exists(extracted_path):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"File {filename} already extracted",
+                        extra={"server": server, "file": filename, "operation": "extract"},
+                    )
+                return Path(extracted_path)
         
-        # Mettre à jour le compteur de retry
-        retry_count = (state.extract_retry_count if state else 0) + 1
-        self.state_manager.update_state(
-            filename,
-            server,
-            extract_retry_count=retry_count,
-            status="copied",  # État après copie, avant extraction
-        )
+        # Répertoires extracted/ et error/* du serveur
+        self.config.ensure_server_dirs(server)
+        
+        # Compteur de retry : écrit avec l'état final, ou dès maintenant si
+        # le checkpoint est activé (état après copie, avant extraction)
+        if state is None:
+            state = self.state_manager.get_or_create_state(filename, server)
+        retry_count = state.extract_retry_count + 1
+        if self.config.state.checkpoint:
+            self.state_manager.patch_state(
+                state,
+                extract_retry_count=retry_count,
+                status="copied",
+            )
         
         try:
             # Extraire avec retry
-            def extract_operation():
-                return self._extract_file(gzip_file, dest_dir)
-            
-            extracted_path = self.retry_operation.execute(extract_operation)
+            kernel = self._kernel_for(server, src)
+            fd, work_path = tempfile.mkstemp(
+                dir=out_dir, prefix=f".{extracted_name}.", suffix=".part"
+            )
+            os.close(fd)
+            self.retry_operation.execute(self._extract_file, src, work_path, kernel)
             
-            # Calculer le checksum du fichier extrait
-            checksum = self.state_manager.calculate_checksum(extracted_path)
-            size = extracted_path.stat().st_size
+            # Checksum et taille calculés avant publication : le fichier publié
+            # peut être remplacé aussitôt par celui d'un autre serveur
+            checksum = self.state_manager.calculate_checksum(work_path, self.checksum_algo)
+            size = os.stat(work_path).st_size
+            os.replace(work_path, extracted_path)
             
             # Mettre à jour l'état
-            self.state_manager.update_state(
-                filename,
-                server,
+            self.state_manager.patch_state(
+                state,
                 status="extracted",
                 checksum=checksum,
                 extract_retry_count=0,  # Reset après succès
@@ -185,15 +593,16 @@ class Extractor:
             # Supprimer le fichier source si configuré
             if self.config.extract.delete_source:
                 try:
-                    gzip_file.unlink()
-                    logger.debug(
-                        f"Source file deleted: {gzip_file}",
-                        extra={"file": str(gzip_file), "operation": "extract"},
-                    )
+                    os.unlink(src)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            f"Source file deleted: {src}",
+                            extra={"file": src, "operation": "extract"},
+                        )
                 except Exception as e:
                     logger.warning(
-                        f"Failed to delete source file {gzip_file}: {e}",
-                        extra={"file": str(gzip_file), "operation": "extract"},
+                        f"Failed to delete source file {src}: {e}",
+                        extra={"file": src, "operation": "extract"},
                     )
             
             logger.info(
@@ -201,23 +610,20 @@ class Extractor:
                 extra={
                     "server": server,
                     "file": filename,
-                    "extracted": str(extracted_path),
+                    "extracted": extracted_path,
                     "operation": "extract",
                 },
             )
             
-            return extracted_path
+            return Path(extracted_path)
             
         except CorruptionError as e:
+            if work_path is not None:
+                _discard(work_path)
             # Fichier corrompu: déplacer vers quarantine
-            quarantine_dir = self.config.data_root / "error" / "quarantine" / server
-            quarantine_dir.mkdir(parents=True, exist_ok=True)
-            
-            quarantine_file = quarantine_dir / filename
-            if quarantine_file.exists():
-                quarantine_file.unlink()
-            
-            gzip_file.rename(quarantine_file)
+            quarantine_file = os.path.join(self._data_root, "error", "quarantine", server, filename)
+            # Écrase atomiquement un éventuel ancien fichier
+            _fast_move(src, quarantine_file)
             
             logger.error(
                 f"Corrupted file moved to quarantine: {quarantine_file}",
@@ -230,25 +636,21 @@ class Extractor:
             )
             
             # Mettre à jour l'état
-            self.state_manager.update_state(
-                filename,
-                server,
+            self.state_manager.patch_state(
+                state,
                 status="error",
                 error_type="corruption",
+                extract_retry_count=retry_count,
             )
             
             return None
             
         except Exception as e:
+            if work_path is not None:
+                _discard(work_path)
             # Autre erreur: déplacer vers error/extract
-            error_dir = self.config.data_root / "error" / "extract" / server
-            error_dir.mkdir(parents=True, exist_ok=True)
-            
-            error_file = error_dir / filename
-            if error_file.exists():
-                error_file.unlink()
-            
-            gzip_file.rename(error_file)
+            error_file = os.path.join(self._data_root, "error", "extract", server, filename)
+            _fast_move(src, error_file)
             
             logger.error(
                 f"File moved to error/extract: {error_file}",
@@ -261,11 +663,11 @@ class Extractor:
             )
             
             # Mettre à jour l'état
-            self.state_manager.update_state(
-                filename,
-                server,
+            self.state_manager.patch_state(
+                state,
                 status="error",
                 error_type="extract",
+                extract_retry_count=retry_count,
             )
             
             logger.error(
@@ -293,15 +695,12 @@ class Extractor:
             Nouveau chemin du fichier.
         """
         processed_dir = self.config.data_root / "processed" / server
-        processed_dir.mkdir(parents=True, exist_ok=True)
+        self.config.ensure_server_dirs(server)
         
         processed_file = processed_dir / gzip_file.name
         
-        # Si le fichier existe déjà dans processed, le supprimer
-        if processed_file.exists():
-            processed_file.unlink()
-        
-        gzip_file.rename(processed_file)
+        # Un fichier déjà présent dans processed est écrasé
+        _fast_move(os.fspath(gzip_file), os.fspath(processed_file))
         
         # Mettre à jour l'état
         filename = gzip_file.name
@@ -322,6 +721,22 @@ class Extractor:
         
         return processed_file
 
+    def extract_to_share(self, gzip_file: Path, server: str) -> Optional[Path]:
+        """
+        Extrait un fichier gzip directement dans ROOT_DIR/inputs/, sans passer
+        par extracted/ (pas de seconde copie si inputs/ est sur un autre volume).
+
+        Args:
+            gzip_file: Chemin du fichier gzip à extraire.
+            server: Nom du serveur source.
+
+        Returns:
+            Chemin du fichier dans inputs/ ou None si échec après retries.
+        """
+        inputs_dir = self.config.inputs_dir
+        _ensure_dir(inputs_dir)
+        return self.extract_file(gzip_file, server, dest_dir=inputs_dir)
+
     def move_extracted_to_share(self, extracted_file: Path, server: str) -> Path:
         """
         Déplace un fichier extrait vers ROOT_DIR/inputs/.
@@ -338,10 +753,8 @@ class Extractor:
 
         dest_file = inputs_dir / extracted_file.name
 
-        if dest_file.exists():
-            dest_file.unlink()
-
-        extracted_file.rename(dest_file)
+        # inputs/ peut être un partage sur un autre système de fichiers
+        _fast_move(os.fspath(extracted_file), os.fspath(dest_file))
 
         logger.info(
             f"File moved to inputs: {dest_file}",
@@ -2,43 +2,104 @@
 import json
 import logging
 import sys
+import time
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from typing import Any, Dict
-from datetime import datetime
 
 from .config import LogConfig
 
+# Encodeur JSON en C (optionnel), nettement plus rapide que json.dumps
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Champs passés via extra={...} repris dans la sortie JSON
+_EXTRA_KEYS = ("server", "file", "operation", "retry_count", "error_type")
+_MISSING = object()
+
 
 class JSONFormatter(logging.Formatter):
     """Formateur JSON pour les logs structurés."""
     
-    def format(self, record: logging.LogRecord) -> str:
-        """Formate un log record en JSON."""
+    # Dernière seconde formatée et son préfixe "YYYY-MM-DDTHH:MM:SS" (UTC)
+    _time_cache = (None, "")
+    
+    def _timestamp(self, created: float) -> str:
+        """Horodatage ISO-8601 UTC (microsecondes) d'un record, préfixe mis en cache par seconde."""
+        seconds = int(created)
+        cached_seconds, prefix = self._time_cache
+        if seconds != cached_seconds:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+            self._time_cache = (seconds, prefix)
+        return f"{prefix}.{int((created - seconds) * 1_000_000):06d}Z"
+    
+    def _log_data(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Construit le dictionnaire sérialisé pour un log record."""
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # Horodatage de création du record (et non de son formatage)
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
         
-        # Ajouter les champs supplémentaires s'ils existent
-        if hasattr(record, "server"):
-            log_data["server"] = record.server
-        if hasattr(record, "file"):
-            log_data["file"] = record.file
-        if hasattr(record, "operation"):
-            log_data["operation"] = record.operation
-        if hasattr(record, "retry_count"):
-            log_data["retry_count"] = record.retry_count
-        if hasattr(record, "error_type"):
-            log_data["error_type"] = record.error_type
+        # Ajouter les champs supplémentaires s'ils existent (lecture directe
+        # du __dict__ du record plutôt que hasattr)
+        record_dict = record.__dict__
+        for key in _EXTRA_KEYS:
+            value = record_dict.get(key, _MISSING)
+            if value is not _MISSING:
+                log_data[key] = value
         
         # Ajouter l'exception si présente
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
         
-        return json.dumps(log_data)
+        return log_data
+    
+    def format_bytes(self, record: logging.LogRecord) -> bytes:
+        """Formate un log record en JSON encodé UTF-8 (sans passer par str avec orjson)."""
+        if orjson is not None:
+            return orjson.dumps(
+                self._log_data(record),
+                default=str,
+            )
+        return json.dumps(self._log_data(record), default=str).encode("utf-8")
+    
+    def format(self, record: logging.LogRecord) -> str:
+        """Formate un log record en JSON."""
+        if orjson is not None:
+            return self.format_bytes(record).decode()
+        return json.dumps(self._log_data(record), default=str)
+
+
+class BytesJSONHandler(RotatingFileHandler):
+    """
+    Handler fichier (avec rotation) qui écrit directement les octets JSON
+    produits par JSONFormatter.format_bytes, sans couche texte ni ré-encodage.
+    """
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        """Écrit un log record, après rotation du fichier si nécessaire."""
+        try:
+            data = self.formatter.format_bytes(record) + b"\n"
+            if self.stream is None:
+                self.stream = self._open()
+            # Toutes les écritures passent par le buffer binaire : la couche
+            # texte n'a jamais de données en attente
+            buffer = self.stream.buffer
+            if self.maxBytes > 0:
+                if buffer.seek(0, 2) + len(data) >= self.maxBytes:
+                    self.doRollover()
+                    buffer = self.stream.buffer
+            buffer.write(data)
+            buffer.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
 
 
 def setup_logger(config: LogConfig, log_dir: Path) -> logging.Logger:
@@ -58,8 +119,15 @@ def setup_logger(config: LogConfig, log_dir: Path) -> logging.Logger:
     # Supprimer les handlers existants pour éviter les doublons
     logger.handlers.clear()
     
-    # Handler pour fichier avec rotation
-    if config.rotation:
+    # Handler pour fichier avec rotation (en JSON, écriture directe des octets)
+    if config.format == "json":
+        log_file = log_dir / "logpipe-relay.log"
+        file_handler = BytesJSONHandler(
+            log_file,
+            maxBytes=config.max_bytes if config.rotation else 0,
+            backupCount=config.backup_count,
+        )
+    elif config.rotation:
         log_file = log_dir / "logpipe-relay.log"
         file_handler = RotatingFileHandler(
             log_file,
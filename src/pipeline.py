@@ -1,4 +1,6 @@
 """Orchestrateur principal du pipeline."""
+import os
+import time
 from pathlib import Path
 from typing import List, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -11,6 +13,9 @@ from .cleanup import CleanupManager
 from .disk import get_available_gb
 from .logger import setup_logger, get_logger
 
+# Durée (s) pendant laquelle le résultat de la vérification d'espace disque est réutilisé
+_DISK_CHECK_TTL = 30.0
+
 
 class Pipeline:
     """Orchestrateur principal du pipeline de traitement des logs."""
@@ -32,10 +37,53 @@ class Pipeline:
         self.collector = Collector(config, self.state_manager)
         self.extractor = Extractor(config, self.state_manager)
         
+        # Pool partagé d'extraction : borne le nombre de fichiers décompressés
+        # simultanément, tous serveurs confondus
+        self.file_executor = ThreadPoolExecutor(
+            max_workers=max(1, config.pipeline.max_concurrent_extractions),
+            thread_name_prefix="extract",
+        )
+        # Pool des serveurs, créé une fois pour la durée de vie du pipeline.
+        # Distinct du pool d'extraction : une tâche serveur attend ses
+        # extractions, un pool unique borné pourrait se bloquer lui-même
+        self.server_executor = ThreadPoolExecutor(
+            max_workers=max(1, config.pipeline.parallel_workers),
+            thread_name_prefix="server",
+        )
+        
+        # Dernière vérification d'espace disque (horloge monotone) et son résultat
+        self._disk_check_ts: Optional[float] = None
+        self._disk_check_ok = True
+        
         self.logger.info("Pipeline initialized", extra={"operation": "init"})
+
+    def close(self) -> None:
+        """
+        Libère les ressources du pipeline : pools de threads, connexions SSH
+        maîtresses et base d'état (les états en attente sont écrits).
+        """
+        self.server_executor.shutdown(wait=True)
+        self.file_executor.shutdown(wait=True)
+        self.collector.close()
+        self.state_manager.close()
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
     
     def _check_disk_space(self) -> bool:
-        """Vérifie que l'espace libre est au-dessus du seuil configuré."""
+        """
+        Vérifie que l'espace libre est au-dessus du seuil configuré.
+
+        Le résultat est réutilisé pendant _DISK_CHECK_TTL secondes.
+        """
+        now = time.monotonic()
+        if self._disk_check_ts is not None and now - self._disk_check_ts < _DISK_CHECK_TTL:
+            return self._disk_check_ok
+
+        ok = True
         try:
             available_gb = get_available_gb(self.config.root_dir)
             threshold = self.config.pipeline.disk_space_threshold_gb
@@ -46,16 +94,17 @@ class Pipeline:
                     f"(threshold: {threshold} GB)",
                     extra={"operation": "disk_check"},
                 )
-                return False
-
-            return True
+                ok = False
         except Exception as e:
             self.logger.error(
                 f"Error checking disk space: {e}",
                 extra={"operation": "disk_check"},
                 exc_info=True,
             )
-            return True
+
+        self._disk_check_ts = now
+        self._disk_check_ok = ok
+        return ok
     
     def process_file_from_server(
         self,
@@ -73,57 +122,111 @@ class Pipeline:
             True si le traitement a réussi.
         """
         filename = Path(remote_path).name
+        # Champs de log communs, construits une fois par étape
+        collect_extra = {"server": server.name, "file": filename, "operation": "collect"}
+        extract_extra = {"server": server.name, "file": filename, "operation": "extract"}
+        process_extra = {"server": server.name, "file": filename, "operation": "process"}
         
         try:
             # Étape 1: Collecte
             self.logger.info(
-                f"Collecting file {filename} from {server.name}",
-                extra={"server": server.name, "file": filename, "operation": "collect"},
+                f"Collecting file {filename} from {server.name}", extra=collect_extra
             )
             
             collected_file = self.collector.collect_file(server, remote_path)
             
             if collected_file is None:
                 self.logger.error(
-                    f"Failed to collect file {filename} from {server.name}",
-                    extra={"server": server.name, "file": filename, "operation": "collect"},
+                    f"Failed to collect file {filename} from {server.name}", extra=collect_extra
                 )
                 return False
             
             # Étape 2: Extraction
-            self.logger.info(
-                f"Extracting file {collected_file}",
-                extra={"server": server.name, "file": filename, "operation": "extract"},
-            )
+            self.logger.info(f"Extracting file {collected_file}", extra=extract_extra)
             
-            extracted_file = self.extractor.extract_file(collected_file, server.name)
+            # Décompression directe dans ROOT_DIR/inputs/
+            extracted_file = self.extractor.extract_to_share(collected_file, server.name)
             
             if extracted_file is None:
-                self.logger.error(
-                    f"Failed to extract file {filename}",
-                    extra={"server": server.name, "file": filename, "operation": "extract"},
-                )
+                self.logger.error(f"Failed to extract file {filename}", extra=extract_extra)
                 return False
             
             # Étape 3: Déplacer le .gz vers processed (si extraction OK et delete_source=False)
             if not self.config.extract.delete_source:
                 self.extractor.move_to_processed(collected_file, server.name)
-
-            # Déplacer le fichier extrait vers ROOT_DIR/inputs/
-            if extracted_file:
-                self.extractor.move_extracted_to_share(extracted_file, server.name)
             
-            self.logger.info(
-                f"File {filename} processed successfully",
-                extra={"server": server.name, "file": filename, "operation": "process"},
-            )
+            self.logger.info(f"File {filename} processed successfully", extra=process_extra)
             
             return True
             
         except Exception as e:
             self.logger.error(
                 f"Error processing file {filename} from {server.name}: {e}",
-                extra={"server": server.name, "file": filename, "operation": "process"},
+                extra=process_extra,
+                exc_info=True,
+            )
+            return False
+    
+    def _already_processed(self, gz_file: Path, server_name: str) -> bool:
+        """
+        Indique si un fichier a déjà été traité lors d'une exécution précédente
+        (statut "processed"), auquel cas il n'est pas ré-extrait.
+        
+        Args:
+            gz_file: Fichier gzip à traiter.
+            server_name: Nom du serveur source.
+        
+        Returns:
+            True si le fichier est déjà traité.
+        """
+        state = self.state_manager.get_state(gz_file.name, server_name)
+        if state is None or state.status != "processed":
+            return False
+        self.logger.info(
+            f"File {gz_file.name} already processed, skipping extraction",
+            extra={"server": server_name, "file": gz_file.name, "operation": "extract"},
+        )
+        return True
+    
+    def _extract_one(self, gz_file: Path, server_name: str, source: str, operation: str) -> bool:
+        """
+        Extrait un fichier, l'archive dans processed/ et dépose le résultat dans inputs/.
+        
+        Args:
+            gz_file: Fichier gzip à traiter.
+            server_name: Nom du serveur source.
+            source: Origine du fichier, pour les logs ("collected set", "incoming").
+            operation: Nom de l'opération pour les logs d'erreur.
+        
+        Returns:
+            True si le fichier a été traité.
+        """
+        try:
+            self.logger.info(
+                f"Extracting file {gz_file.name} from {source}",
+                extra={
+                    "server": server_name,
+                    "file": gz_file.name,
+                    "operation": "extract",
+                },
+            )
+            
+            # Décompression directe dans ROOT_DIR/inputs/
+            extracted_file = self.extractor.extract_to_share(gz_file, server_name)
+            if not extracted_file:
+                return False
+            
+            if not self.config.extract.delete_source:
+                self.extractor.move_to_processed(gz_file, server_name)
+            return True
+        except Exception as e:
+            self.logger.error(
+                f"Error processing file {gz_file.name} from {server_name}: {e}",
+                extra={
+                    "server": server_name,
+                    "file": gz_file.name,
+                    "operation": operation,
+                },
                 exc_info=True,
             )
             return False
@@ -156,38 +259,19 @@ class Pipeline:
         processed = 0
         failed = 0
 
-        # Étape 2 : extraire les fichiers collectés (ils sont maintenant dans incoming/)
-        for local_file in collected_files:
-            try:
-                self.logger.info(
-                    f"Extracting file {local_file.name} from collected set",
-                    extra={
-                        "server": server.name,
-                        "file": local_file.name,
-                        "operation": "extract",
-                    },
-                )
-
-                extracted_file = self.extractor.extract_file(local_file, server.name)
-
-                if extracted_file:
-                    if not self.config.extract.delete_source:
-                        self.extractor.move_to_processed(local_file, server.name)
-                    # Déplacer le fichier extrait vers ROOT_DIR/inputs/
-                    self.extractor.move_extracted_to_share(extracted_file, server.name)
-                    processed += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                self.logger.error(
-                    f"Error processing collected file {local_file.name} from {server.name}: {e}",
-                    extra={
-                        "server": server.name,
-                        "file": local_file.name,
-                        "operation": "process_server",
-                    },
-                    exc_info=True,
-                )
+        # Étape 2 : extraire les fichiers collectés (ils sont maintenant dans incoming/),
+        # en parallèle sur le pool d'extraction partagé
+        futures = [
+            self.file_executor.submit(
+                self._extract_one, local_file, server.name, "collected set", "process_server"
+            )
+            for local_file in collected_files
+            if not self._already_processed(local_file, server.name)
+        ]
+        for future in as_completed(futures):
+            if future.result():
+                processed += 1
+            else:
                 failed += 1
 
         return {
@@ -210,50 +294,38 @@ class Pipeline:
         
         incoming_dir = self.config.data_root / "incoming"
         
-        # Parcourir tous les serveurs
+        # Parcourir tous les serveurs ; chaque fichier est soumis dès qu'il est
+        # trouvé (extraction parallèle, tous serveurs confondus)
+        futures = []
         for server_config in self.config.servers:
             if not server_config.enabled:
                 continue
             
-            server_incoming = incoming_dir / server_config.name
-            
-            if not server_incoming.exists():
+            try:
+                with os.scandir(incoming_dir / server_config.name) as it:
+                    for entry in it:
+                        if not entry.name.endswith(".gz") or not entry.is_file(follow_symlinks=False):
+                            continue
+                        gz_file = Path(entry.path)
+                        if self._already_processed(gz_file, server_config.name):
+                            continue
+                        futures.append(
+                            self.file_executor.submit(
+                                self._extract_one,
+                                gz_file,
+                                server_config.name,
+                                "incoming",
+                                "process_incoming",
+                            )
+                        )
+            except FileNotFoundError:
                 continue
-            
-            # Parcourir les fichiers .gz dans incoming
-            for gz_file in server_incoming.glob("*.gz"):
-                try:
-                    self.logger.info(
-                        f"Extracting file {gz_file.name} from incoming",
-                        extra={
-                            "server": server_config.name,
-                            "file": gz_file.name,
-                            "operation": "extract",
-                        },
-                    )
-                    
-                    extracted_file = self.extractor.extract_file(gz_file, server_config.name)
-                    
-                    if extracted_file:
-                        if not self.config.extract.delete_source:
-                            self.extractor.move_to_processed(gz_file, server_config.name)
-                        # Déplacer le fichier extrait vers ROOT_DIR/inputs/
-                        self.extractor.move_extracted_to_share(extracted_file, server_config.name)
-                        stats["processed"] += 1
-                    else:
-                        stats["failed"] += 1
-                        
-                except Exception as e:
-                    self.logger.error(
-                        f"Error processing file {gz_file.name}: {e}",
-                        extra={
-                            "server": server_config.name,
-                            "file": gz_file.name,
-                            "operation": "process_incoming",
-                        },
-                        exc_info=True,
-                    )
-                    stats["failed"] += 1
+        
+        for future in as_completed(futures):
+            if future.result():
+                stats["processed"] += 1
+            else:
+                stats["failed"] += 1
         
         self.logger.info(
             f"Processed {stats['processed']} files, {stats['failed']} failed",
@@ -282,43 +354,43 @@ class Pipeline:
         """
         self.logger.info("Starting pipeline execution", extra={"operation": "run"})
 
-        overall_stats = {
-            "servers": {},
-            "incoming": {"processed": 0, "failed": 0},
-            "cleanup": {},
-            "cleanup_pre": {},
-        }
+        try:
+            overall_stats = {
+                "servers": {},
+                "incoming": {"processed": 0, "failed": 0},
+                "cleanup": {},
+                "cleanup_pre": {},
+            }
 
-        if run_cleanup:
-            pre_cleanup = CleanupManager(self.config, self.state_manager).run_disk_cleanup()
-            overall_stats["cleanup_pre"] = pre_cleanup
-            if pre_cleanup.get("triggered"):
-                self.logger.info(
-                    f"Pre-run disk cleanup: {pre_cleanup.get('deleted', 0)} file(s) deleted, "
-                    f"{pre_cleanup.get('available_gb_before')} → "
-                    f"{pre_cleanup.get('available_gb_after')} GB free",
-                    extra={"operation": "run", "cleanup_pre": pre_cleanup},
-                )
+            if run_cleanup:
+                pre_cleanup = CleanupManager(self.config, self.state_manager).run_disk_cleanup()
+                overall_stats["cleanup_pre"] = pre_cleanup
+                if pre_cleanup.get("triggered"):
+                    self.logger.info(
+                        f"Pre-run disk cleanup: {pre_cleanup.get('deleted', 0)} file(s) deleted, "
+                        f"{pre_cleanup.get('available_gb_before')} → "
+                        f"{pre_cleanup.get('available_gb_after')} GB free",
+                        extra={"operation": "run", "cleanup_pre": pre_cleanup},
+                    )
 
-        if not self._check_disk_space():
-            self.logger.warning(
-                "Low disk space detected, but continuing",
-                extra={"operation": "run"},
-            )
+            if not self._check_disk_space():
+                self.logger.warning(
+                    "Low disk space detected, but continuing",
+                    extra={"operation": "run"},
+                )
 
-        # Traiter les fichiers incoming si demandé
-        if process_incoming:
-            overall_stats["incoming"] = self.process_incoming_files()
+            # Traiter les fichiers incoming si demandé
+            if process_incoming:
+                overall_stats["incoming"] = self.process_incoming_files()
         
-        # Traiter les serveurs
-        if parallel and len(self.config.servers) > 1:
-            # Parallélisation limitée par parallel_workers
-            with ThreadPoolExecutor(max_workers=self.config.pipeline.parallel_workers) as executor:
+            # Traiter les serveurs
+            if parallel and len(self.config.servers) > 1:
+                # Parallélisation limitée par parallel_workers (pool partagé du pipeline)
                 futures = {
-                    executor.submit(self.process_server, server): server.name
+                    self.server_executor.submit(self.process_server, server): server.name
                     for server in self.config.servers
                 }
-                
+            
                 for future in as_completed(futures):
                     server_name = futures[future]
                     try:
@@ -335,31 +407,34 @@ class Pipeline:
                             "failed": 0,
                             "error": str(e),
                         }
-        else:
-            # Traitement séquentiel
-            for server in self.config.servers:
-                try:
-                    result = self.process_server(server)
-                    overall_stats["servers"][server.name] = result
-                except Exception as e:
-                    self.logger.error(
-                        f"Error processing server {server.name}: {e}",
-                        extra={"server": server.name, "operation": "run"},
-                        exc_info=True,
-                    )
-                    overall_stats["servers"][server.name] = {
-                        "processed": 0,
-                        "failed": 0,
-                        "error": str(e),
-                    }
+            else:
+                # Traitement séquentiel
+                for server in self.config.servers:
+                    try:
+                        result = self.process_server(server)
+                        overall_stats["servers"][server.name] = result
+                    except Exception as e:
+                        self.logger.error(
+                            f"Error processing server {server.name}: {e}",
+                            extra={"server": server.name, "operation": "run"},
+                            exc_info=True,
+                        )
+                        overall_stats["servers"][server.name] = {
+                            "processed": 0,
+                            "failed": 0,
+                            "error": str(e),
+                        }
 
-        if run_cleanup:
-            overall_stats["cleanup"] = self.run_cleanup()
+            if run_cleanup:
+                overall_stats["cleanup"] = self.run_cleanup()
 
-        self.logger.info(
-            "Pipeline execution completed",
-            extra={"operation": "run", "stats": overall_stats},
-        )
+            self.logger.info(
+                "Pipeline execution completed",
+                extra={"operation": "run", "stats": overall_stats},
+            )
         
-        return overall_stats
+            return overall_stats
+        finally:
+            # Écrire les états encore en mémoire, même en cas d'erreur
+            self.state_manager.flush()
 
@@ -1,14 +1,24 @@
 """Mécanisme de retry avec backoff exponentiel."""
 import time
 import random
-from functools import wraps
-from typing import Callable, TypeVar, Optional, Any
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 from .config import RetryConfig
 from .logger import get_logger
 
 logger = get_logger()
 T = TypeVar("T")
 
+# Jitter : jusqu'à 25% du délai
+_JITTER = 0.25
+_rand = random.random
+
+
+@lru_cache(maxsize=128)
+def _base_backoff_delay(attempt: int, base_delay: float, max_delay: float, multiplier: float) -> float:
+    """Délai de backoff sans jitter (paramètres fixes par RetryConfig, mis en cache)."""
+    return min(base_delay * (multiplier ** (attempt - 1)), max_delay)
+
 
 def calculate_backoff_delay(
     attempt: int,
@@ -30,17 +40,101 @@ def calculate_backoff_delay(
     Returns:
         Délai en secondes.
     """
-    delay = base_delay * (multiplier ** (attempt - 1))
-    delay = min(delay, max_delay)
+    delay = _base_backoff_delay(attempt, base_delay, max_delay, multiplier)
     
     if use_jitter:
         # Ajouter jusqu'à 25% de jitter
-        jitter = delay * 0.25 * random.random()
+        jitter = delay * _JITTER * _rand()
         delay = delay + jitter
     
     return delay
 
 
+def _retry_core(
+    func: Callable[..., T],
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    max_retries: int,
+    config: RetryConfig,
+    operation_name: str,
+    log_retries: bool = True,
+) -> T:
+    """
+    Boucle de retry commune à retry_with_backoff et RetryableOperation.
+    
+    Args:
+        func: Fonction à exécuter.
+        args: Arguments positionnels.
+        kwargs: Arguments nommés.
+        max_retries: Nombre maximum de tentatives.
+        config: Configuration du retry.
+        operation_name: Nom de l'opération pour les logs.
+        log_retries: Logger les retries.
+    
+    Returns:
+        Résultat de la fonction.
+    
+    Raises:
+        Exception: La dernière exception si toutes les tentatives échouent.
+    """
+    last_exception: Optional[Exception] = None
+    
+    for attempt in range(1, max_retries + 1):
+        try:
+            result = func(*args, **kwargs)
+            
+            # Succès après retry
+            if attempt > 1 and log_retries:
+                logger.info(
+                    f"{operation_name} succeeded after {attempt} attempts",
+                    extra={"operation": operation_name, "retry_count": attempt},
+                )
+            
+            return result
+            
+        except Exception as e:
+            last_exception = e
+            
+            if attempt < max_retries:
+                delay = calculate_backoff_delay(
+                    attempt,
+                    config.delay_base,
+                    config.delay_max,
+                    config.backoff_multiplier,
+                )
+                
+                if log_retries:
+                    logger.warning(
+                        f"{operation_name} failed (attempt {attempt}/{max_retries}): {str(e)}. "
+                        f"Retrying in {delay:.2f}s...",
+                        extra={
+                            "operation": operation_name,
+                            "retry_count": attempt,
+                            "error_type": type(e).__name__,
+                        },
+                    )
+                
+                time.sleep(delay)
+            else:
+                # Dernière tentative échouée
+                if log_retries:
+                    logger.error(
+                        f"{operation_name} failed after {max_retries} attempts: {str(e)}",
+                        extra={
+                            "operation": operation_name,
+                            "retry_count": attempt,
+                            "error_type": type(e).__name__,
+                        },
+                        exc_info=True,
+                    )
+    
+    # Toutes les tentatives ont échoué
+    if last_exception:
+        raise last_exception
+    else:
+        raise RuntimeError(f"{operation_name} failed after {max_retries} attempts")
+
+
 def retry_with_backoff(
     max_retries: int,
     config: RetryConfig,
@@ -62,62 +156,9 @@ def retry_with_backoff(
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> T:
-            last_exception: Optional[Exception] = None
-            
-            for attempt in range(1, max_retries + 1):
-                try:
-                    result = func(*args, **kwargs)
-                    
-                    # Succès après retry
-                    if attempt > 1 and log_retries:
-                        logger.info(
-                            f"{operation_name} succeeded after {attempt} attempts",
-                            extra={"operation": operation_name, "retry_count": attempt},
-                        )
-                    
-                    return result
-                    
-                except Exception as e:
-                    last_exception = e
-                    
-                    if attempt < max_retries:
-                        delay = calculate_backoff_delay(
-                            attempt,
-                            config.delay_base,
-                            config.delay_max,
-                            config.backoff_multiplier,
-                        )
-                        
-                        if log_retries:
-                            logger.warning(
-                                f"{operation_name} failed (attempt {attempt}/{max_retries}): {str(e)}. "
-                                f"Retrying in {delay:.2f}s...",
-                                extra={
-                                    "operation": operation_name,
-                                    "retry_count": attempt,
-                                    "error_type": type(e).__name__,
-                                },
-                            )
-                        
-                        time.sleep(delay)
-                    else:
-                        # Dernière tentative échouée
-                        if log_retries:
-                            logger.error(
-                                f"{operation_name} failed after {max_retries} attempts: {str(e)}",
-                                extra={
-                                    "operation": operation_name,
-                                    "retry_count": attempt,
-                                    "error_type": type(e).__name__,
-                                },
-                                exc_info=True,
-                            )
-            
-            # Toutes les tentatives ont échoué
-            if last_exception:
-                raise last_exception
-            else:
-                raise RuntimeError(f"{operation_name} failed after {max_retries} attempts")
+            return _retry_core(
+                func, args, kwargs, max_retries, config, operation_name, log_retries
+            )
         
         return wrapper
     return decorator
@@ -159,55 +200,6 @@ class RetryableOperation:
         Raises:
             Exception: Si toutes les tentatives échouent.
         """
-        last_exception: Optional[Exception] = None
-        
-        for attempt in range(1, self.max_retries + 1):
-            try:
-                result = func(*args, **kwargs)
-                
-                if attempt > 1:
-                    logger.info(
-                        f"{self.operation_name} succeeded after {attempt} attempts",
-                        extra={"operation": self.operation_name, "retry_count": attempt},
-                    )
-                
-                return result
-                
-            except Exception as e:
-                last_exception = e
-                
-                if attempt < self.max_retries:
-                    delay = calculate_backoff_delay(
-                        attempt,
-                        self.config.delay_base,
-                        self.config.delay_max,
-                        self.config.backoff_multiplier,
-                    )
-                    
-                    logger.warning(
-                        f"{self.operation_name} failed (attempt {attempt}/{self.max_retries}): {str(e)}. "
-                        f"Retrying in {delay:.2f}s...",
-                        extra={
-                            "operation": self.operation_name,
-                            "retry_count": attempt,
-                            "error_type": type(e).__name__,
-                        },
-                    )
-                    
-                    time.sleep(delay)
-                else:
-                    logger.error(
-                        f"{self.operation_name} failed after {self.max_retries} attempts: {str(e)}",
-                        extra={
-                            "operation": self.operation_name,
-                            "retry_count": attempt,
-                            "error_type": type(e).__name__,
-                        },
-                        exc_info=True,
-                    )
-        
-        if last_exception:
-            raise last_exception
-        else:
-            raise RuntimeError(f"{self.operation_name} failed after {self.max_retries} attempts")
-
+        return _retry_core(
+            func, args, kwargs, self.max_retries, self.config, self.operation_name
+        )
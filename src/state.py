@@ -1,15 +1,114 @@
 """Gestion de l'état des fichiers pour garantir l'idempotence."""
+import atexit
 import json
 import hashlib
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any
-from datetime import datetime
-from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
+from dataclasses import dataclass
 
 from .logger import get_logger
 
 logger = get_logger()
 
+# Taille des blocs lus pour le checksum quand hashlib.file_digest est indisponible
+_CHECKSUM_BLOCK_SIZE = 1 << 20
+
+# Statuts terminaux : écrits immédiatement sur disque
+_TERMINAL_STATUSES = frozenset(("processed", "error"))
+
+# Nombre d'états modifiés non écrits au-delà duquel on réveille le thread d'écriture
+_MAX_DIRTY_STATES = 64
+
+# Intervalle (s) entre deux écritures des états en attente par le thread d'écriture
+_FLUSH_INTERVAL = 1.0
+
+# Base d'état (une ligne par couple serveur/fichier)
+_STATE_DB_NAME = "state.db"
+
+# Attente maximale (s) d'un verrou posé par un autre processus
+_SQLITE_TIMEOUT = 30.0
+
+# Nombre maximal de noms par requête IN (limite de paramètres SQLite)
+_BULK_QUERY_SIZE = 500
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS files (
+    server TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    checksum TEXT,
+    copy_retry INTEGER NOT NULL DEFAULT 0,
+    extract_retry INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error_type TEXT,
+    last_updated TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    PRIMARY KEY (server, filename)
+)"""
+# WITHOUT ROWID (SQLite 3.8.2+) : la clé primaire est la table elle-même
+if sqlite3.sqlite_version_info >= (3, 8, 2):
+    _CREATE_TABLE += " WITHOUT ROWID"
+
+# Colonnes dans l'ordre des champs de FileState
+_COLUMNS = (
+    "filename, server, checksum, copy_retry, extract_retry, "
+    "status, error_type, last_updated, size, mtime_ns"
+)
+
+# INSERT OR REPLACE / OR IGNORE plutôt que ON CONFLICT (SQLite 3.24+ seulement,
+# absent des distributions anciennes) : toutes les colonnes étant écrites,
+# le remplacement de la ligne équivaut à un upsert
+_VALUES = f"({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_IGNORE = f"INSERT OR IGNORE INTO files {_VALUES}"
+_UPSERT = f"INSERT OR REPLACE INTO files {_VALUES}"
+
+# BLAKE3 (optionnel) : nettement plus rapide que SHA-256 sur les gros fichiers
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+
+def checksum_factory(algorithm: str):
+    """
+    Constructeur de hash pour un algorithme de checksum.
+
+    Args:
+        algorithm: "sha256" ou "blake3".
+
+    Returns:
+        Callable retournant un objet hash (update/hexdigest).
+
+    Raises:
+        ValueError: Si l'algorithme est inconnu ou si blake3 n'est pas installé.
+    """
+    if algorithm == "sha256":
+        return hashlib.sha256
+    if algorithm == "blake3":
+        if blake3 is None:
+            raise ValueError("blake3 checksum requested but the blake3 package is not installed")
+        return blake3
+    raise ValueError(f"Unknown checksum algorithm: {algorithm}")
+
+
+# Préfixe ISO-8601 de la seconde courante : (seconde, "AAAA-MM-JJTHH:MM:SS")
+_ts_cache = (None, "")
+
+
+def _now_iso() -> str:
+    """Horodatage ISO-8601 UTC (microsecondes), préfixe mis en cache par seconde."""
+    global _ts_cache
+    now = time.time()
+    seconds = int(now)
+    cached_seconds, prefix = _ts_cache
+    if seconds != cached_seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _ts_cache = (seconds, prefix)
+    return f"{prefix}.{int((now - seconds) * 1_000_000):06d}Z"
+
 
 @dataclass
 class FileState:
@@ -23,80 +122,289 @@ class FileState:
     error_type: Optional[str] = None  # copy, extract, corruption
     last_updated: str = ""
     size: Optional[int] = None
+    mtime_ns: Optional[int] = None  # mtime de la copie locale (vérification rapide)
     
     def __post_init__(self):
         """Initialiser last_updated si vide."""
         if not self.last_updated:
-            self.last_updated = datetime.utcnow().isoformat() + "Z"
+            self.last_updated = _now_iso()
+
+
+def _state_row(state: FileState) -> Tuple[Any, ...]:
+    """Valeurs d'un état dans l'ordre de _COLUMNS."""
+    return (
+        state.filename,
+        state.server,
+        state.checksum,
+        state.copy_retry_count,
+        state.extract_retry_count,
+        state.status,
+        state.error_type,
+        state.last_updated,
+        state.size,
+        state.mtime_ns,
+    )
 
 
 class StateManager:
-    """Gestionnaire d'état pour suivre les fichiers."""
+    """Gestionnaire d'état pour suivre les fichiers (base SQLite en mode WAL)."""
     
     def __init__(self, state_dir: Path):
         """
         Initialise le gestionnaire d'état.
         
         Args:
-            state_dir: Répertoire pour stocker les fichiers d'état.
+            state_dir: Répertoire contenant la base d'état (state.db).
         """
         self.state_dir = Path(state_dir)
         self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.state_dir / _STATE_DB_NAME
+        # Protège le cycle lecture/modification/écriture de update_state
+        # (collecte et extraction parallèles), le cache et la connexion
+        self._lock = threading.RLock()
+        # Cache en mémoire des états lus ou modifiés, et clés pas encore écrites
+        self._cache: Dict[Tuple[str, str], FileState] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        # Connexion unique partagée entre threads (accès sérialisés par _lock) ;
+        # autocommit, les transactions sont explicites
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=_SQLITE_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_CREATE_TABLE)
+        self._migrate_json_states()
+        # Thread d'écriture : les états intermédiaires sont écrits par lots,
+        # hors des threads de collecte et d'extraction
+        self._flush_wakeup = threading.Event()
+        self._closing = False
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="state-flush", daemon=True
+        )
+        self._flusher.start()
+        # Écrire les états en attente à la sortie du processus
+        atexit.register(self.close)
+
+    def _migrate_json_states(self) -> None:
+        """Importe puis supprime les anciens fichiers d'état JSON (un par fichier)."""
+        json_files = list(self.state_dir.glob("*.json"))
+        if not json_files:
+            return
+
+        rows = []
+        for state_file in json_files:
+            try:
+                with open(state_file, "r") as f:
+                    rows.append(_state_row(FileState(**json.load(f))))
+            except Exception as e:
+                logger.warning(f"Error reading state file {state_file}: {e}")
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Ne pas écraser un état déjà présent en base
+                self._conn.executemany(_INSERT_IGNORE, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+        for state_file in json_files:
+            try:
+                state_file.unlink()
+            except OSError as e:
+                logger.warning(f"Error deleting state file {state_file}: {e}")
+
+        logger.info(
+            f"Migrated {len(rows)} JSON state file(s) to {self.db_path}",
+            extra={"operation": "state"},
+        )
     
-    def _get_state_file(self, filename: str, server: str) -> Path:
+    def get_state(self, filename: str, server: str) -> Optional[FileState]:
         """
-        Retourne le chemin du fichier d'état pour un fichier donné.
+        Récupère l'état d'un fichier.
         
         Args:
             filename: Nom du fichier.
             server: Nom du serveur.
         
         Returns:
-            Chemin du fichier d'état.
+            FileState ou None si inexistant.
+
+        Raises:
+            RuntimeError: Si le gestionnaire a été fermé (close()).
         """
-        # Utiliser un hash pour éviter les problèmes de caractères spéciaux
-        safe_name = hashlib.md5(f"{server}:{filename}".encode()).hexdigest()
-        return self.state_dir / f"{safe_name}.json"
+        key = (server, filename)
+        with self._lock:
+            self._check_open()
+            state = self._cache.get(key)
+            if state is not None:
+                return state
+
+            try:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM files WHERE server = ? AND filename = ?",
+                    key,
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Error reading state for {server}:{filename}: {e}")
+                return None
+
+            if row is None:
+                return None
+            state = FileState(*row)
+            self._cache[key] = state
+            return state
     
-    def get_state(self, filename: str, server: str) -> Optional[FileState]:
+    def get_states_bulk(self, server: str, filenames: Iterable[str]) -> Dict[str, FileState]:
         """
-        Récupère l'état d'un fichier.
+        Récupère en une fois les états de plusieurs fichiers d'un serveur.
         
         Args:
-            filename: Nom du fichier.
             server: Nom du serveur.
+            filenames: Noms des fichiers.
         
         Returns:
-            FileState ou None si inexistant.
+            Dictionnaire nom de fichier -> FileState (fichiers sans état absents).
+
+        Raises:
+            RuntimeError: Si le gestionnaire a été fermé (close()).
         """
-        state_file = self._get_state_file(filename, server)
-        
-        if not state_file.exists():
-            return None
-        
-        try:
-            with open(state_file, "r") as f:
-                data = json.load(f)
-                return FileState(**data)
-        except Exception as e:
-            logger.warning(f"Error reading state file {state_file}: {e}")
-            return None
+        states: Dict[str, FileState] = {}
+        with self._lock:
+            self._check_open()
+            missing = []
+            for filename in filenames:
+                state = self._cache.get((server, filename))
+                if state is not None:
+                    states[filename] = state
+                else:
+                    missing.append(filename)
+
+            # Une requête par lot (limite du nombre de paramètres SQLite)
+            for i in range(0, len(missing), _BULK_QUERY_SIZE):
+                batch = missing[i:i + _BULK_QUERY_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                try:
+                    rows = self._conn.execute(
+                        f"SELECT {_COLUMNS} FROM files "
+                        f"WHERE server = ? AND filename IN ({placeholders})",
+                        (server, *batch),
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error reading states for {server}: {e}")
+                    continue
+                for row in rows:
+                    state = FileState(*row)
+                    self._cache[(server, state.filename)] = state
+                    states[state.filename] = state
+        return states
     
     def save_state(self, state: FileState) -> None:
         """
         Sauvegarde l'état d'un fichier.
+
+        L'état est conservé en mémoire ; il n'est écrit en base
+        immédiatement que pour un statut terminal (processed, error). Les
+        autres sont écrits par lots par le thread d'écriture (toutes les
+        _FLUSH_INTERVAL secondes, ou plus tôt si trop d'états sont en attente).
         
         Args:
             state: État à sauvegarder.
+
+        Raises:
+            RuntimeError: Si le gestionnaire a été fermé (close()).
+        """
+        key = (state.server, state.filename)
+        state.last_updated = _now_iso()
+
+        with self._lock:
+            self._check_open()
+            self._cache[key] = state
+            if state.status in _TERMINAL_STATUSES:
+                self._dirty.discard(key)
+                if not self._write_states([state]):
+                    # Réessayé par le thread d'écriture
+                    self._dirty.add(key)
+                return
+            self._dirty.add(key)
+            if len(self._dirty) > _MAX_DIRTY_STATES:
+                self._flush_wakeup.set()
+
+    def _check_open(self) -> None:
+        """Lève RuntimeError si la base a été fermée (appelé sous _lock)."""
+        if self._conn is None:
+            raise RuntimeError("StateManager fermé")
+
+    def _flush_loop(self) -> None:
+        """Boucle du thread d'écriture : écrit périodiquement les états en attente."""
+        while not self._closing:
+            self._flush_wakeup.wait(_FLUSH_INTERVAL)
+            self._flush_wakeup.clear()
+            with self._lock:
+                if self._conn is None:
+                    return
+                self.flush()
+
+    def _write_states(self, states: List[FileState]) -> bool:
+        """
+        Écrit des états en base dans une seule transaction (upsert).
+
+        Args:
+            states: États à écrire.
+
+        Returns:
+            True si la transaction a été validée, False sinon (erreur journalisée).
         """
-        state_file = self._get_state_file(state.filename, state.server)
-        state.last_updated = datetime.utcnow().isoformat() + "Z"
-        
         try:
-            with open(state_file, "w") as f:
-                json.dump(asdict(state), f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving state file {state_file}: {e}", exc_info=True)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(_UPSERT, [_state_row(s) for s in states])
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error saving {len(states)} state(s) to {self.db_path}: {e}", exc_info=True)
+            return False
+
+    def flush(self) -> None:
+        """
+        Écrit en base tous les états modifiés en attente.
+
+        En cas d'échec (base verrouillée par un autre processus...), les états
+        restent en attente et seront réessayés au prochain flush ou à close().
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty = self._dirty
+            self._dirty = set()
+            states = [self._cache[key] for key in dirty if key in self._cache]
+            if states and not self._write_states(states):
+                self._dirty |= dirty
+
+    def close(self) -> None:
+        """Arrête le thread d'écriture, écrit les états en attente puis ferme la base."""
+        self._closing = True
+        self._flush_wakeup.set()
+        if self._flusher is not threading.current_thread():
+            self._flusher.join()
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            if self._dirty:
+                logger.error(
+                    f"{len(self._dirty)} state(s) could not be saved to {self.db_path}",
+                    extra={"operation": "state"},
+                )
+            self._conn.close()
+            self._conn = None
     
     def update_state(
         self,
@@ -108,6 +416,7 @@ class StateManager:
         extract_retry_count: Optional[int] = None,
         error_type: Optional[str] = None,
         size: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
     ) -> FileState:
         """
         Met à jour l'état d'un fichier.
@@ -121,29 +430,59 @@ class StateManager:
             extract_retry_count: Nouveau compteur de retry extract.
             error_type: Type d'erreur.
             size: Taille du fichier.
+            mtime_ns: Date de modification du fichier (nanosecondes).
         
         Returns:
             FileState mis à jour.
         """
+        changes = {
+            name: value
+            for name, value in (
+                ("status", status),
+                ("checksum", checksum),
+                ("copy_retry_count", copy_retry_count),
+                ("extract_retry_count", extract_retry_count),
+                ("error_type", error_type),
+                ("size", size),
+                ("mtime_ns", mtime_ns),
+            )
+            if value is not None
+        }
+        with self._lock:
+            return self.patch_state(self.get_or_create_state(filename, server), **changes)
+
+    def get_or_create_state(self, filename: str, server: str) -> FileState:
+        """
+        Récupère l'état d'un fichier, ou un nouvel état "pending" (non sauvegardé).
+
+        Args:
+            filename: Nom du fichier.
+            server: Nom du serveur.
+
+        Returns:
+            FileState existant ou nouveau.
+        """
         state = self.get_state(filename, server)
-        
         if state is None:
             state = FileState(filename=filename, server=server)
-        
-        if status is not None:
-            state.status = status
-        if checksum is not None:
-            state.checksum = checksum
-        if copy_retry_count is not None:
-            state.copy_retry_count = copy_retry_count
-        if extract_retry_count is not None:
-            state.extract_retry_count = extract_retry_count
-        if error_type is not None:
-            state.error_type = error_type
-        if size is not None:
-            state.size = size
-        
-        self.save_state(state)
+        return state
+
+    def patch_state(self, state: FileState, **changes: Any) -> FileState:
+        """
+        Modifie un état déjà détenu par l'appelant puis le sauvegarde,
+        sans le relire (voir get_state / get_or_create_state).
+
+        Args:
+            state: État à modifier.
+            **changes: Champs de FileState à remplacer.
+
+        Returns:
+            Le même FileState, mis à jour.
+        """
+        with self._lock:
+            for name, value in changes.items():
+                setattr(state, name, value)
+            self.save_state(state)
         return state
     
     def delete_state(self, filename: str, server: str) -> None:
@@ -153,36 +492,51 @@ class StateManager:
         Args:
             filename: Nom du fichier.
             server: Nom du serveur.
+
+        Raises:
+            RuntimeError: Si le gestionnaire a été fermé (close()).
         """
-        state_file = self._get_state_file(filename, server)
-        
-        if state_file.exists():
+        key = (server, filename)
+        with self._lock:
+            self._check_open()
+            self._cache.pop(key, None)
+            self._dirty.discard(key)
             try:
-                state_file.unlink()
-            except Exception as e:
-                logger.warning(f"Error deleting state file {state_file}: {e}")
+                self._conn.execute(
+                    "DELETE FROM files WHERE server = ? AND filename = ?", key
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Error deleting state for {server}:{filename}: {e}")
     
-    def calculate_checksum(self, filepath: Path) -> str:
+    
+    def calculate_checksum(self, filepath: Path, algorithm: str = "sha256") -> str:
         """
-        Calcule le checksum SHA256 d'un fichier.
+        Calcule le checksum d'un fichier (SHA256 par défaut).
         
         Args:
             filepath: Chemin du fichier.
+            algorithm: "sha256" ou "blake3" (voir checksum_factory).
         
         Returns:
             Checksum hexadécimal.
         """
-        sha256 = hashlib.sha256()
-        
+        factory = checksum_factory(algorithm)
         try:
             with open(filepath, "rb") as f:
-                # Lire par chunks pour les gros fichiers
+                # Python 3.11+ : boucle de lecture/hachage en C, sans le GIL
+                if hasattr(hashlib, "file_digest"):
+                    return hashlib.file_digest(f, factory).hexdigest()
+
+                # Sinon, lecture par blocs de 1 Mio dans un tampon réutilisé
+                digest = factory()
+                buffer = bytearray(_CHECKSUM_BLOCK_SIZE)
+                view = memoryview(buffer)
                 while True:
-                    chunk = f.read(8192)
-                    if not chunk:
+                    n = f.readinto(buffer)
+                    if not n:
                         break
-                    sha256.update(chunk)
-            return sha256.hexdigest()
+                    digest.update(view[:n])
+                return digest.hexdigest()
         except Exception as e:
             logger.error(f"Error calculating checksum for {filepath}: {e}", exc_info=True)
             raise